@@ -0,0 +1,121 @@
+"""
+Runs the benchmarks and compares the results with the stored baseline.
+
+    python -m benchmarks                  # run all benchmark modules, compare with baseline.json
+    python -m benchmarks context merge    # run only bench_context.py and bench_merge.py
+    python -m benchmarks --save           # add results missing from the baseline, e.g. of new benchmarks
+    python -m benchmarks merge --save --update "10 levels"  # also replace the results with "10 levels" in the name
+    python -m benchmarks --check          # exit with status 1 if a result regressed beyond the threshold
+
+Saving keeps existing baseline values unless they are selected with --update, so that a change only touches the
+entries of the benchmarks it adds or deliberately changes. Baselines depend on the machine, so regenerate them with
+--save --replace before comparing on another machine.
+"""
+
+import argparse
+import importlib
+import json
+import pkgutil
+import sys
+from pathlib import Path
+
+import benchmarks
+from benchmarks.common import format_value
+
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+
+
+def benchmark_modules(selected):
+    names = sorted(
+        module.name.removeprefix("bench_")
+        for module in pkgutil.iter_modules(benchmarks.__path__)
+        if module.name.startswith("bench_")
+    )
+    unknown = set(selected) - set(names)
+    if unknown:
+        raise SystemExit(f"Unknown benchmarks: {', '.join(sorted(unknown))}. Available: {', '.join(names)}")
+    return [name for name in names if not selected or name in selected]
+
+
+def load_baseline():
+    if BASELINE_FILE.exists():
+        return json.loads(BASELINE_FILE.read_text())
+    return {}
+
+
+def save(results, baseline, update, replace):
+    """
+    Adds the results missing from the module baseline, and replaces those selected by `update` or `replace`.
+    Returns the number of saved results.
+    """
+    saved = 0
+    for result_name, result in results.items():
+        if replace or result_name not in baseline or any(text in result_name for text in update):
+            baseline[result_name] = result
+            saved += 1
+    return saved
+
+
+def compare(name, results, baseline, threshold):
+    """
+    Prints the results next to the baseline values, returns the names of regressed results.
+    """
+    regressions = []
+    print(f"\n{name}")
+    for result_name, (value, unit) in results.items():
+        line = f"  {result_name:<60} {format_value(value, unit)}"
+        if result_name in baseline:
+            baseline_value = baseline[result_name][0]
+            ratio = value / baseline_value if baseline_value else float("inf")
+            line += f"  {ratio:6.2f}x baseline"
+            if ratio > threshold:
+                line += "  REGRESSION"
+                regressions.append(f"{name}: {result_name}")
+        print(line)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmarks", nargs="*", help="benchmark modules to run, without the bench_ prefix")
+    parser.add_argument("--save", action="store_true", help="add results missing from the baseline")
+    parser.add_argument(
+        "--update", action="append", default=[], metavar="TEXT",
+        help="with --save, also replace baseline results whose name contains TEXT, can be repeated",
+    )
+    parser.add_argument(
+        "--replace", action="store_true", help="with --save, replace all baseline results of the run modules",
+    )
+    parser.add_argument("--check", action="store_true", help="fail if a result regressed beyond the threshold")
+    parser.add_argument("--threshold", type=float, default=1.5, help="ratio to baseline counted as a regression")
+    args = parser.parse_args(argv)
+
+    if (args.update or args.replace) and not args.save:
+        parser.error("--update and --replace require --save")
+
+    baseline = load_baseline()
+    regressions = []
+    saved = 0
+
+    for name in benchmark_modules(args.benchmarks):
+        results = importlib.import_module(f"benchmarks.bench_{name}").run()
+        regressions += compare(name, results, baseline.get(name, {}), args.threshold)
+        if args.save:
+            saved += save(results, baseline.setdefault(name, {}), args.update, args.replace)
+
+    if saved:
+        BASELINE_FILE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"\n{saved} result(s) saved to {BASELINE_FILE}")
+    elif args.save:
+        print("\nNo new results, baseline unchanged")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold}x baseline")
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
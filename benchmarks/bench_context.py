@@ -0,0 +1,318 @@
+"""
+Realistic workloads for the different context types, compared against contextvars and threading.local:
+
+- get latency vs call stack depth
+- set latency vs context size and nesting depth of the updated value
+- wrap() call overhead
+- capture() and restore() handoff, compared with set() of the same values
+- thread and asyncio fan-out
+- memory per active scope
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_context
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+from benchmarks.common import at_depth
+from benchmarks.common import memory_per_level
+from benchmarks.common import per_call
+from benchmarks.common import report
+from benchmarks.common import timed
+from cntxt import Context
+from cntxt import ContextVarStorage
+from cntxt import DataclassMixinMeta
+from cntxt import Stack
+from cntxt import capture_all
+from cntxt import context
+from cntxt import restore_all
+from cntxt.manager import dynamic
+
+try:
+    from cntxt.pydantic import Context as PydanticContext
+except ImportError:  # pydantic is optional
+    PydanticContext = None
+
+
+DEPTHS = (1, 10, 50, 100)
+FAN_OUT = 16
+OPERATIONS_PER_WORKER = 500
+
+
+class Ctx(Context):
+    a: int = 0
+
+
+class VarCtx(Context, storage=ContextVarStorage):
+    a: int = 0
+
+
+class SlottedCtx(Context, frozen=True, slots=True):
+    a: int = 0
+
+
+if PydanticContext:
+    class PydanticCtx(PydanticContext):
+        a: int = 0
+
+
+class Namespace:
+    a: int = 0
+
+
+var = ContextVar("a", default=0)
+local = threading.local()
+stack = Stack()
+dyn = dynamic(Namespace)
+
+
+def context_class(field_count, base=Context):
+    """
+    Creates a Context class with `field_count` int fields and a nested dict field.
+    """
+    namespace = {"__annotations__": {f"f{i}": int for i in range(field_count)}, "__module__": __name__}
+    namespace.update({f"f{i}": 0 for i in range(field_count)})
+    namespace["__annotations__"]["nested"] = dict
+    namespace["nested"] = None
+    return DataclassMixinMeta(f"Ctx{field_count}", (base,), namespace)
+
+
+def nested_value(depth):
+    value = 0
+    for _ in range(depth):
+        value = {"n": value, "other": list(range(10))}
+    return value
+
+
+def get_latency():
+    """
+    Reading a value set at the bottom of the call stack, from `depth` frames higher.
+    """
+    results = {}
+
+    def measure(name, enter, read, number=2000):
+        for depth in DEPTHS:
+            with enter():
+                results[f"get {name}, depth {depth}"] = at_depth(depth, lambda: per_call(read, number))
+
+    measure("Context", lambda: Ctx.set(a=1), lambda: Ctx.a)
+    measure("Context (ContextVarStorage)", lambda: VarCtx.set(a=1), lambda: VarCtx.a)
+    measure("Context (frozen, slots)", lambda: SlottedCtx.set(a=1), lambda: SlottedCtx.a)
+    measure("context (dict)", lambda: context.set(a=1), lambda: context["a"])
+    if PydanticContext:
+        measure("pydantic Context", lambda: PydanticCtx.set(a=1), lambda: PydanticCtx.a)
+
+    stack.a = 1
+    for depth in DEPTHS:
+        results[f"get Stack, depth {depth}"] = at_depth(depth, lambda: per_call(lambda: stack.a, 500))
+
+    dyn.a = 1
+    for depth in DEPTHS:
+        results[f"get dynamic, depth {depth}"] = at_depth(depth, lambda: per_call(lambda: dyn.a == 1, 500))
+
+    token = var.set(1)
+    for depth in DEPTHS:
+        results[f"get contextvars baseline, depth {depth}"] = at_depth(depth, lambda: per_call(var.get, 20000))
+    var.reset(token)
+
+    local.a = 1
+    for depth in DEPTHS:
+        results[f"get threading.local baseline, depth {depth}"] = at_depth(
+            depth, lambda: per_call(lambda: local.a, 20000),
+        )
+
+    return results
+
+
+def set_latency():
+    results = {}
+
+    for field_count in (10, 100):
+        context_type = context_class(field_count)
+
+        def set_scalar():
+            with context_type.set(f0=1):
+                pass
+
+        results[f"set Context, {field_count} fields"] = per_call(set_scalar, 500)
+
+    context_type = context_class(10)
+    for depth in (1, 5, 20):
+        key = "nested" + "__n" * (depth - 1) + "__other__0"
+
+        def set_nested():
+            with context_type.set(**{key: 1}):
+                pass
+
+        with context_type.set(nested=nested_value(depth)):
+            results[f"set Context, nested depth {depth}"] = per_call(set_nested, 500)
+
+    def set_var():
+        token = var.set(1)
+        var.reset(token)
+
+    results["set contextvars baseline"] = per_call(set_var, 20000)
+
+    return results
+
+
+def wrap_overhead():
+    def func():
+        return Ctx.a
+
+    wrapped = Ctx.wrap(func, a=1)
+    double_wrapped = Ctx.wrap(wrapped, a=2)
+    var_wrapped = VarCtx.wrap(func, a=1)
+
+    async def coroutine():
+        return Ctx.a
+
+    wrapped_coroutine = Ctx.wrap(coroutine, a=1)
+    calls = 2000
+
+    def await_calls(coroutine_function):
+        async def main():
+            for _ in range(calls):
+                await coroutine_function()
+        return timed(lambda: asyncio.run(main())) / calls, "s"
+
+    def async_set():
+        async def main():
+            for _ in range(calls):
+                async with Ctx.aset(a=1):
+                    Ctx.a
+        return timed(lambda: asyncio.run(main())) / calls, "s"
+
+    return {
+        "call plain function": per_call(func, 20000),
+        "call Context.wrap()ped function": per_call(wrapped, 2000),
+        "call double Context.wrap()ped function": per_call(double_wrapped, 2000),
+        "call Context.wrap()ped function (ContextVarStorage)": per_call(var_wrapped, 2000),
+        "await plain coroutine": await_calls(coroutine),
+        "await Context.wrap()ped coroutine": await_calls(wrapped_coroutine),
+        "async with Context.aset()": async_set(),
+    }
+
+
+def handoff():
+    context_type = context_class(10)
+    values = {f"f{i}": i for i in range(10)}
+
+    with context_type.set(**values):
+        token = context_type.capture()
+        scopes = capture_all()
+        results = {
+            "capture Context": per_call(context_type.capture, 20000),
+            "capture_all": per_call(capture_all, 2000),
+        }
+
+    def set_values():
+        with context_type.set(**values):
+            pass
+
+    def restore():
+        with context_type.restore(token):
+            pass
+
+    def restore_scopes():
+        with restore_all(scopes):
+            pass
+
+    results["set Context, 10 values"] = per_call(set_values, 2000)
+    results["restore Context"] = per_call(restore, 2000)
+    results["restore_all"] = per_call(restore_scopes, 2000)
+    return results
+
+
+def fan_out():
+    results = {}
+    operations = FAN_OUT * OPERATIONS_PER_WORKER
+
+    def context_worker(context_type):
+        def work(i):
+            for j in range(OPERATIONS_PER_WORKER):
+                with context_type.set(a=j):
+                    assert context_type.a == j
+        return work
+
+    def var_worker(i):
+        for j in range(OPERATIONS_PER_WORKER):
+            token = var.set(j)
+            assert var.get() == j
+            var.reset(token)
+
+    for name, work in (
+        ("Context", context_worker(Ctx)),
+        ("Context (ContextVarStorage)", context_worker(VarCtx)),
+        ("contextvars baseline", var_worker),
+    ):
+        def threads():
+            with ThreadPoolExecutor(FAN_OUT) as executor:
+                list(executor.map(work, range(FAN_OUT)))
+
+        async def tasks():
+            async def task(i):
+                work(i)
+            await asyncio.gather(*(task(i) for i in range(FAN_OUT)))
+
+        results[f"thread fan-out, set + get, {name}"] = timed(threads) / operations, "s"
+        results[f"asyncio fan-out, set + get, {name}"] = timed(lambda: asyncio.run(tasks())) / operations, "s"
+
+    return results
+
+
+def memory():
+    levels = 200
+
+    def plain(level, measure):
+        return plain(level - 1, measure) if level else measure()
+
+    def nest_context(context_type):
+        def nest(level, measure):
+            if not level:
+                return measure()
+            with context_type.set(a=level):
+                return nest(level - 1, measure)
+        return nest
+
+    def nest_dynamic(level, measure):
+        if not level:
+            return measure()
+        dyn.a = level
+        return nest_dynamic(level - 1, measure)
+
+    def nest_var(level, measure):
+        if not level:
+            return measure()
+        token = var.set(level)
+        try:
+            return nest_var(level - 1, measure)
+        finally:
+            var.reset(token)
+
+    frame_cost = memory_per_level(plain, levels)[0]
+
+    def per_scope(nest):
+        value, unit = memory_per_level(nest, levels)
+        return value - frame_cost, unit
+
+    return {
+        "memory per scope, Context": per_scope(nest_context(Ctx)),
+        "memory per scope, Context (ContextVarStorage)": per_scope(nest_context(VarCtx)),
+        "memory per scope, Context (frozen, slots)": per_scope(nest_context(SlottedCtx)),
+        "memory per scope, context (dict)": per_scope(nest_context(context)),
+        "memory per scope, dynamic": per_scope(nest_dynamic),
+        "memory per scope, contextvars baseline": per_scope(nest_var),
+    }
+
+
+def run():
+    return get_latency() | set_latency() | wrap_overhead() | handoff() | fan_out() | memory()
+
+
+if __name__ == "__main__":
+    report(run())
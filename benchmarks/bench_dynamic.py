@@ -0,0 +1,124 @@
+"""
+Cost of reading a nested value of a dynamic() structure, memory held by the returned proxies, and cost of a single
+mutation and of 1000 mutations with and without batch(), with full deep copies and with copy-on-write, and cost of
+a mutation next to a large buffer.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_dynamic
+"""
+
+import gc
+import sys
+import tracemalloc
+
+from benchmarks.common import at_depth
+from benchmarks.common import per_call
+from benchmarks.common import report
+from benchmarks.common import timed
+from cntxt.manager import batch
+from cntxt.manager import dynamic
+from samples import dyna_logging
+
+
+class Namespace:
+    a = 0
+
+
+def get_nested(dyn):
+    return dyn["a"]["b"] == 0
+
+
+def repeated_operations(proxy, count=100):
+    for _ in range(count):
+        proxy == 0
+
+
+def held_proxy_memory(dyn, count=1000):
+    """
+    Bytes per proxy when holding on to the results of `count` reads of the same path.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        held = [dyn["obj"] for _ in range(count)]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before - sys.getsizeof(held)) / count, "B"
+
+
+def filtered_log(plain_leaves):
+    """
+    log() call in samples/dyna_logging.py that is filtered out by the log level.
+    """
+    original_stack = dyna_logging.stack
+    dyna_logging.stack = dynamic(dyna_logging.LogSettings, plain_leaves=plain_leaves)
+    try:
+        dyna_logging.stack.log_level = dyna_logging.LogLevel.WARNING
+        return per_call(lambda: dyna_logging.log(dyna_logging.LogLevel.DEBUG, "filtered"), 2000)
+    finally:
+        dyna_logging.stack = original_stack
+
+
+def fill(dyn, count=1000):
+    for i in range(count):
+        dyn["items"].append(i)
+
+
+def fill_in_batch(dyn, count=1000):
+    with batch(dyn):
+        for i in range(count):
+            dyn["items"].append(i)
+
+
+def set_nested(dyn):
+    dyn["a"]["b"] = 1
+
+
+def append(dyn):
+    dyn["items"].append(1)
+
+
+def run():
+    results = {}
+
+    dyn = dynamic({"a": {"b": 0}, "items": [], "obj": Namespace()})
+    results["dyn['a']['b'] == 0"] = per_call(lambda: get_nested(dyn), 2000)
+    results["dyn['items'] == []"] = per_call(lambda: dyn["items"] == [], 2000)
+    results["dyn['obj'].a == 0"] = per_call(lambda: dyn["obj"].a == 0, 2000)
+    results["memory per held dyn['obj'] proxy"] = held_proxy_memory(dyn)
+
+    held = dyn["a"]["b"]
+    results["100 x held proxy == 0, one frame, depth 50"] = at_depth(
+        50, lambda: per_call(lambda: repeated_operations(held), 20),
+    )
+
+    results["filtered log() in dyna_logging sample, proxies"] = filtered_log(plain_leaves=False)
+    results["filtered log() in dyna_logging sample, plain_leaves"] = filtered_log(plain_leaves=True)
+
+    for size in (100, 10_000):
+        for copy_on_write in (False, True):
+            mode = "copy-on-write" if copy_on_write else "deepcopy"
+            dyn = dynamic(
+                {"a": {"b": 0}, "items": list(range(size)), "lookup": {i: str(i) for i in range(size)}},
+                copy_on_write=copy_on_write,
+            )
+            number = 2000 if copy_on_write else 20
+            results[f"dyn['a']['b'] = 1, {size} entries, {mode}"] = per_call(lambda: set_nested(dyn), number)
+            results[f"dyn['items'].append(1), {size} entries, {mode}"] = per_call(lambda: append(dyn), number)
+    dyn = dynamic({"a": {"b": 0}, "payload": bytearray(50_000_000)})
+    results["dyn['a']['b'] = 1, with a 50 MB bytearray, deepcopy"] = per_call(lambda: set_nested(dyn), 20)
+
+    for copy_on_write in (False, True):
+        mode = "copy-on-write" if copy_on_write else "deepcopy"
+        dyn = dynamic({"items": [], "lookup": {i: str(i) for i in range(100)}}, copy_on_write=copy_on_write)
+        results[f"1000 x dyn['items'].append(i), {mode}"] = timed(lambda: fill(dyn)), "s"
+        results[f"1000 x dyn['items'].append(i) in batch(), {mode}"] = timed(lambda: fill_in_batch(dyn)), "s"
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,88 @@
+"""
+Throughput of running tasks in a thread pool with the scopes of the submitting code, compared with wrapping every
+task by hand and with no scope propagation at all.
+
+For process pools, a context holding a 1 MB value is compared with sending the value as an argument to every task.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_futures
+"""
+
+import concurrent.futures
+
+from benchmarks.common import report
+from benchmarks.common import timed
+from cntxt import Context
+from cntxt.futures import ProcessPoolExecutor
+from cntxt.futures import ThreadPoolExecutor
+
+
+TASKS = 100_000
+PROCESS_TASKS = 2000
+WORKERS = 8
+
+
+class Ctx(Context):
+    a: int = 0
+    blob: bytes = None
+
+
+def task(i):
+    return Ctx.a
+
+
+def blob_task(i, blob=None):
+    return len(blob or Ctx.blob)
+
+
+def run():
+    results = {}
+
+    def submit(executor_class, wrap=False):
+        def submit_all():
+            with Ctx.set(a=1), executor_class(WORKERS) as executor:
+                if wrap:
+                    futures = [executor.submit(Ctx.wrap(task, a=Ctx.a), i) for i in range(TASKS)]
+                else:
+                    futures = [executor.submit(task, i) for i in range(TASKS)]
+                for future in futures:
+                    future.result()
+        return timed(submit_all, repeat=1) / TASKS, "s"
+
+    def map_all(executor_class):
+        def map_tasks():
+            with Ctx.set(a=1), executor_class(WORKERS) as executor:
+                for _ in executor.map(task, range(TASKS)):
+                    pass
+        return timed(map_tasks, repeat=1) / TASKS, "s"
+
+    results[f"submit {TASKS} tasks, no scopes baseline"] = submit(concurrent.futures.ThreadPoolExecutor)
+    results[f"submit {TASKS} tasks, Ctx.wrap() per task"] = submit(concurrent.futures.ThreadPoolExecutor, wrap=True)
+    results[f"submit {TASKS} tasks, cntxt ThreadPoolExecutor"] = submit(ThreadPoolExecutor)
+    results[f"map {TASKS} tasks, no scopes baseline"] = map_all(concurrent.futures.ThreadPoolExecutor)
+    results[f"map {TASKS} tasks, cntxt ThreadPoolExecutor"] = map_all(ThreadPoolExecutor)
+
+    blob = bytes(1_000_000)
+
+    def process_submit(executor_class, as_argument):
+        def submit_all():
+            with Ctx.set(blob=blob), executor_class(WORKERS) as executor:
+                arguments = (blob,) if as_argument else ()
+                futures = [executor.submit(blob_task, i, *arguments) for i in range(PROCESS_TASKS)]
+                for future in futures:
+                    future.result()
+        return timed(submit_all, repeat=1) / PROCESS_TASKS, "s"
+
+    results[f"process submit {PROCESS_TASKS} tasks, 1 MB value as argument baseline"] = process_submit(
+        concurrent.futures.ProcessPoolExecutor, as_argument=True,
+    )
+    results[f"process submit {PROCESS_TASKS} tasks, 1 MB value in context"] = process_submit(
+        ProcessPoolExecutor, as_argument=False,
+    )
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
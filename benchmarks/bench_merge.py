@@ -0,0 +1,40 @@
+"""
+Cost of update_dict as a function of the size of the context and the number of updated paths.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_merge
+"""
+
+import copy
+
+from benchmarks.common import per_call
+from benchmarks.common import report
+from cntxt import update_dict
+
+
+def make_tree(width, depth):
+    if depth == 0:
+        return list(range(width))
+    return {f"k{i}": make_tree(width, depth - 1) for i in range(width)}
+
+
+def updates_for(width, changed):
+    return {f"k{i % width}__k{i // width % width}__{i % width}": i for i in range(changed)}
+
+
+def run():
+    results = {}
+    for width in (4, 16, 32):
+        tree = make_tree(width, 2)
+        results[f"deepcopy, {width ** 3} leaves"] = per_call(lambda: copy.deepcopy(tree), 20)
+        for changed in (1, 10, 100):
+            updates = updates_for(width, changed)
+            results[f"update_dict, {width ** 3} leaves, {changed} paths"] = per_call(
+                lambda: update_dict(tree, **updates), 200,
+            )
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
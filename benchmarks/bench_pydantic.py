@@ -0,0 +1,69 @@
+"""
+set() on a 50-field nested pydantic Context, with full revalidation and with delta_validation.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_pydantic
+"""
+
+from benchmarks.common import per_call
+from benchmarks.common import report
+
+try:
+    from cntxt.pydantic import Context
+    from cntxt.pydantic import PydanticDataclassMixinMeta
+except ImportError:  # pydantic is optional
+    Context = None
+
+
+FIELD_COUNT = 50
+NESTED_FIELD_COUNT = 10
+
+
+def context_class(name, base, field_types, **kwargs):
+    namespace = {"__annotations__": dict(field_types), "__module__": __name__}
+    namespace.update({field_name: None for field_name in field_types})
+    return PydanticDataclassMixinMeta(name, (base,), namespace, **kwargs)
+
+
+def nested_context(delta_validation):
+    """
+    Context with `FIELD_COUNT` fields, a fifth of which are nested models with list fields.
+    """
+    item_type = context_class("Item", Context, {f"i{i}": list[int] | None for i in range(NESTED_FIELD_COUNT)})
+    field_types = {
+        f"f{i}": item_type | None if i % 5 == 0 else int | None for i in range(FIELD_COUNT)
+    }
+    context_type = context_class("Big", Context, field_types, delta_validation=delta_validation)
+    values = {
+        f"f{i}": item_type(**{f"i{j}": list(range(20)) for j in range(NESTED_FIELD_COUNT)}) if i % 5 == 0 else i
+        for i in range(FIELD_COUNT)
+    }
+    return context_type, values
+
+
+def run():
+    if not Context:
+        return {}
+
+    results = {}
+    for name, delta_validation in (("full validation", False), ("delta_validation", True)):
+        context_type, values = nested_context(delta_validation)
+
+        def set_scalar():
+            with context_type.set(f1=1):
+                pass
+
+        def set_nested():
+            with context_type.set(f0__i0__0=1):
+                pass
+
+        with context_type.set(**values):
+            results[f"set scalar field, {FIELD_COUNT} fields, {name}"] = per_call(set_scalar, 200)
+            results[f"set nested field, {FIELD_COUNT} fields, {name}"] = per_call(set_nested, 200)
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
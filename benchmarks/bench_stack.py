@@ -0,0 +1,83 @@
+"""
+Creating Context and DataclassStack classes, assigning fields of dataclass-backed stacks, and memory held by
+repeated assignments to a Stack in one frame.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_stack
+"""
+
+import gc
+import tracemalloc
+
+from benchmarks.common import at_depth
+from benchmarks.common import per_call
+from benchmarks.common import report
+from cntxt import Context
+from cntxt import DataclassMixinMeta
+from cntxt import DataclassStack
+from cntxt import Stack
+
+
+FIELD_COUNT = 20
+
+
+def namespace():
+    annotations = {f"f{i}": int for i in range(FIELD_COUNT)}
+    return {"__annotations__": annotations, "__module__": __name__} | {name: 0 for name in annotations}
+
+
+class Conf(DataclassStack):
+    host: str = "localhost"
+    port: int = 80
+
+
+def memory_after_assignments(count):
+    """
+    Bytes held after `count` assignments to a Stack attribute in a loop in one frame.
+    """
+    stack = Stack()
+
+    def loop():
+        for i in range(count):
+            stack.x = i
+        return tracemalloc.get_traced_memory()[0]
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        held = loop()
+    finally:
+        tracemalloc.stop()
+    return held - before, "B"
+
+
+def run():
+    results = {}
+
+    results[f"create Context class, {FIELD_COUNT} fields"] = per_call(
+        lambda: DataclassMixinMeta("Created", (Context,), namespace()), 50,
+    )
+    results[f"create DataclassStack class, {FIELD_COUNT} fields"] = per_call(
+        lambda: type("Created", (DataclassStack,), namespace()), 50,
+    )
+
+    results["create DataclassStack instance"] = per_call(Conf, 2000)
+
+    conf = Conf()
+
+    def assign():
+        conf.port = 8080
+
+    for depth in (1, 10, 50):
+        results[f"assign DataclassStack field, depth {depth}"] = at_depth(depth, lambda: per_call(assign, 200))
+
+    for count in (1_000, 1_000_000):
+        results[f"memory held after {count} Stack assignments in one frame"] = memory_after_assignments(count)
+
+    return results
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,77 @@
+"""
+50k concurrent asyncio tasks, each setting a context value, yielding to the event loop and reading the value back.
+
+Without the cntxt task factory, the tasks of a Context class with the default frame storage do not see the scope
+entered in main(), and share the scopes of the frames running the event loop, so the values they read are not
+reliable. The factory run is compared with that,
+with ContextVarStorage, and with a plain ContextVar.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_tasks
+"""
+
+import asyncio
+from contextvars import ContextVar
+
+from benchmarks.common import report
+from benchmarks.common import timed
+from cntxt import Context
+from cntxt import ContextVarStorage
+from cntxt.tasks import task_factory
+
+
+TASKS = 50_000
+
+
+class Ctx(Context):
+    a: int = 0
+    b: int = 0
+
+
+class VarCtx(Context, storage=ContextVarStorage):
+    a: int = 0
+    b: int = 0
+
+
+var = ContextVar("a", default=0)
+
+
+def context_task(context_type):
+    async def task(i):
+        with context_type.set(a=i):
+            await asyncio.sleep(0)
+            return context_type.a, context_type.b
+    return task
+
+
+async def var_task(i):
+    token = var.set(i)
+    try:
+        await asyncio.sleep(0)
+        return var.get()
+    finally:
+        var.reset(token)
+
+
+def run_tasks(task, factory=None, context_type=Ctx):
+    async def main():
+        if factory:
+            asyncio.get_running_loop().set_task_factory(factory)
+        with context_type.set(b=1):
+            await asyncio.gather(*(asyncio.create_task(task(i)) for i in range(TASKS)))
+
+    return timed(lambda: asyncio.run(main()), repeat=1) / TASKS, "s"
+
+
+def run():
+    return {
+        f"{TASKS} tasks, Context, no task factory (unreliable)": run_tasks(context_task(Ctx)),
+        f"{TASKS} tasks, Context, cntxt task factory": run_tasks(context_task(Ctx), task_factory),
+        f"{TASKS} tasks, Context (ContextVarStorage)": run_tasks(context_task(VarCtx), context_type=VarCtx),
+        f"{TASKS} tasks, contextvars baseline": run_tasks(var_task),
+    }
+
+
+if __name__ == "__main__":
+    report(run())
@@ -0,0 +1,59 @@
+"""
+Helpers shared by the benchmark modules.
+
+Every benchmark module has a `run()` function returning a dict of result name to (value, unit), where unit is "s"
+for seconds per operation or "B" for bytes.
+"""
+
+import gc
+import timeit
+import tracemalloc
+
+
+def per_call(func, number, repeat=5):
+    """
+    Best of `repeat` timings, in seconds per call.
+    """
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number, "s"
+
+
+def timed(func, repeat=3):
+    """
+    Best of `repeat` runs of a function that does its own looping, in seconds.
+    """
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def at_depth(depth, func):
+    """
+    Calls func with `depth` extra frames on the call stack.
+    """
+    if depth <= 0:
+        return func()
+    return at_depth(depth - 1, func)
+
+
+def memory_per_level(nest, levels):
+    """
+    Bytes held per level by `nest(levels, measure)`, which should nest `levels` times and call `measure()` at the
+    innermost level.
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        held = nest(levels, lambda: tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+    return (held - before) / levels, "B"
+
+
+def format_value(value, unit):
+    if unit == "s":
+        return f"{value * 1e6:12.3f} us"
+    return f"{value:12.1f} B "
+
+
+def report(results):
+    for name, (value, unit) in results.items():
+        print(f"{name:<60} {format_value(value, unit)}")
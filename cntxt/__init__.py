@@ -1,19 +1,37 @@
-import copy
 import inspect
+from collections import namedtuple
+from contextlib import asynccontextmanager
 from contextlib import contextmanager
-from dataclasses import asdict
+from dataclasses import MISSING
 from dataclasses import dataclass
 from dataclasses import fields
 from dataclasses import is_dataclass
+from functools import lru_cache
+from functools import wraps
+from operator import itemgetter
+from types import MappingProxyType
+from types import MemberDescriptorType
 from types import SimpleNamespace
 from typing import Self
 
 
-__all__ = "context", "Context", "DictContext"
+__all__ = (
+    "context", "Context", "DictContext", "ContextVarStorage", "FrameStorage", "ref", "capture_all", "restore_all",
+)
 
 from typing import TypeVar
 
+from cntxt.cache import MergeCache
+from cntxt.copying import ref
 from cntxt.manager import Manager
+from cntxt.paths import apply_updates
+from cntxt.paths import compile_updates
+from cntxt.paths import parse_key
+from cntxt.scopes import Scopes
+from cntxt.scopes import capture
+from cntxt.storage import ContextStack
+from cntxt.storage import ContextVarStorage
+from cntxt.storage import FrameStorage
 from cntxt.wrappers import wrap_target
 
 
@@ -31,6 +49,8 @@ def update_dict(dct, **updates):
     """
     Updates nested dict values with Django-like query syntax. Returns an updated copy of the original dict.
 
+    Only the containers along the updated paths are copied, other values are shared with the original dict.
+
     If some parameter has value REMOVED, it is removed from the dict.
 
     Example:
@@ -38,35 +58,37 @@ def update_dict(dct, **updates):
         >>> update_dict(dct, a__b=4, c__0=5, c__1=REMOVED, d=REMOVED, e=6, f={"g": 1})
         {'a': {'b': 4}, 'c': [5], 'e': 6, 'f': {'g': 1}}
     """
-    copy_of_dct = copy.deepcopy(dct)
-
-    for key, value in updates.items():
-        node = copy_of_dct
-        key_parts = key.split("__")
-        for i, key_part in enumerate(key_parts, 1):
-            if key_part.isdigit():
-                key_part = int(key_part)
-
-            if i < len(key_parts):  # Not a leaf node
-                node = node[key_part]
-            else:
-                if value is REMOVED:
-                    try:
-                        node.pop(key_part)
-                    except (IndexError, KeyError):
-                        pass
-                else:
-                    node[key_part] = value
+    return apply_updates(dct, compile_updates(updates), REMOVED)
 
-    return copy_of_dct
 
+def field_dict(obj):
+    """
+    Shallow alternative to dataclasses.asdict, nested values are not copied.
+    """
+    return {field.name: getattr(obj, field.name) for field in fields(obj)}
 
 
-class ContextStack(list):
-    pass
+@lru_cache(maxsize=None)
+def snapshot_type(dataclass_type):
+    """
+    Returns a namedtuple type with the fields of the dataclass. Field names that namedtuple does not accept, like
+    ones starting with an underscore, are renamed positionally and aliased with properties of the original names.
+    """
+    names = [field.name for field in fields(dataclass_type)]
+    snapshot = namedtuple(f"{dataclass_type.__name__}Snapshot", names, rename=True)
+    aliases = {
+        name: property(itemgetter(index), doc=f"Alias for field number {index}")
+        for index, (name, field_name) in enumerate(zip(names, snapshot._fields))
+        if name != field_name
+    }
+    if aliases:
+        snapshot = type(snapshot.__name__, (snapshot,), {"__slots__": (), **aliases})
+    return snapshot
 
 
 class IdentifiedClass:
+    __slots__ = ()
+
     @classmethod
     def _class_identifier(cls):
         # return f"_cntxt_{str(cls)}"
@@ -85,80 +107,118 @@ class Stack:
         self._stack_class = stack_class
 
     def __getattribute__(self, key):
-        print(self, key)
-        if key in ("_stack_class", "set", "_get_scope_dict"):
+        if key in ("_stack_class", "set", "_get_scope", "_get_scope_dict", "_new_scope", "_set_in_frame"):
             return object.__getattribute__(self, key)
 
+        stack_key = locals_key(self)
         frame = inspect.currentframe()
         while frame := frame.f_back:
-            if scopes := frame.f_locals.get(locals_key(self)):
+            if scopes := frame.f_locals.get(stack_key):
                 return object.__getattribute__(scopes[-1], key)
 
         return object.__getattribute__(self, key)
 
     def __setattr__(self, key, value):
-        print(self, key, value)
         if key == "_stack_class":
             object.__setattr__(self, key, value)
             return
 
-        previous_scope_dict = self._get_scope_dict(inspect.currentframe())
+        self._set_in_frame(inspect.currentframe().f_back, key, value)
 
-        current_scopes = inspect.currentframe().f_back.f_locals.setdefault(locals_key(self), [])
-        new_scope_dict = update_dict(previous_scope_dict, **{key: value})
-        current_scopes.append(self._stack_class(**new_scope_dict))
+    def _set_in_frame(self, frame, key, value):
+        """
+        Sets the value in a new scope for the frame.
+
+        The new scope is built on the frame's own latest scope if it has one, so it replaces that scope instead of
+        being appended. Repeated assignments in a frame thus keep a constant number of scopes.
+        """
+        new_scope = self._new_scope(inspect.currentframe(), {key: value})
+        scopes = frame.f_locals.setdefault(locals_key(self), [])
+        if scopes:
+            scopes[-1] = new_scope
+        else:
+            scopes.append(new_scope)
 
     @contextmanager
     def set(self, **kwargs):
-        previous_scope_dict = self._get_scope_dict(inspect.currentframe().f_back)
+        new_scope = self._new_scope(inspect.currentframe().f_back, kwargs)
 
         current_locals = inspect.currentframe().f_back.f_back.f_locals
         current_scopes = current_locals.setdefault(locals_key(self), [])
         items_before_block = len(current_scopes)
 
-        new_scope_dict = update_dict(previous_scope_dict, **kwargs)
-        current_scopes.append(self._stack_class(**new_scope_dict))
+        current_scopes.append(new_scope)
 
         yield
 
         current_locals[locals_key(self)] = current_scopes[:items_before_block]
 
-    def _get_scope_dict(self, frame):
+    def _new_scope(self, frame, updates):
+        """
+        Returns a new scope with the updates applied to the scope visible from above the given frame.
+        """
+        new_scope_dict = update_dict(self._get_scope_dict(frame), **updates)
+        return self._stack_class(**new_scope_dict)
+
+    def _get_scope(self, frame):
+        stack_key = locals_key(self)
         while frame := frame.f_back:
-            if previous_scopes := frame.f_locals.get(locals_key(self)):
-                previous_scope = previous_scopes[-1]
-                if is_dataclass(previous_scope):
-                    return asdict(previous_scope)
-                else:
-                    return previous_scope.__dict__
-        else:
+            if previous_scopes := frame.f_locals.get(stack_key):
+                return previous_scopes[-1]
+        return None
+
+    def _get_scope_dict(self, frame):
+        previous_scope = self._get_scope(frame)
+        if previous_scope is None:
             return {}
+        if is_dataclass(previous_scope):
+            return field_dict(previous_scope)
+        return previous_scope.__dict__
 
 
 class DataclassStack(Stack):
-    def __new__(cls, *args, **kwargs):
-        datacls = super().__new__(dataclass(cls))
-        datacls.__init__(*args, **kwargs)
-        return datacls
+    """
+    Stack defined as a dataclass, where the fields give the initial values:
+
+        class Conf(DataclassStack):
+            hostname: str = "https://host.net"
+
+        conf = Conf()
+    """
+
+    _initialized = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        dataclass(cls)
+        cls._stack_class = cls
+        cls._field_names = frozenset(field.name for field in fields(cls))
+
+        dataclass_init = cls.__init__
+
+        @wraps(dataclass_init)
+        def __init__(self, *args, **kwargs):
+            dataclass_init(self, *args, **kwargs)
+            object.__setattr__(self, "_initialized", True)
+
+        cls.__init__ = __init__
 
     def __setattr__(self, key, value):
-        print(key, "-", value)
         # Plain attribute setting when initializing
-        frame = inspect.currentframe()
-        while frame:
-            print("-", frame.f_code.co_qualname)
-            if frame.f_code.co_qualname == f"DataclassStack.__new__":
-                object.__setattr__(self, key, value)
-                return
-            frame = frame.f_back
+        if not object.__getattribute__(self, "_initialized"):
+            object.__setattr__(self, key, value)
+            return
 
         # Set values in stack if part of dataclass fields
-        if any(key == field.name for field in fields(self)):
-            super().__setattr__(key, value)
+        if key in object.__getattribute__(self, "_field_names"):
+            self._set_in_frame(inspect.currentframe().f_back, key, value)
             return
 
         raise AttributeError(f"{key} is not an attribute of {type(self)}")
 
+    def _get_scope_dict(self, frame):
+        return super()._get_scope_dict(frame) or field_dict(self)
+
 
 stack = Stack()
 
@@ -186,77 +246,355 @@ class DictMixinMeta(type):
         return current_scope[item]
 
 
+def merge_function(dataclass_type, construct_directly):
+    """
+    Generates a _merge method for a dataclass context, like dataclasses generates __init__.
+
+    Field values are copied directly and only the fields named in the updates are rebuilt. Updates to unknown
+    fields, or removing fields without defaults, fall back to the generic ContextMixin._merge.
+
+    With `construct_directly`, the merged instance is created without calling __init__.
+    """
+    dataclass_fields = fields(dataclass_type)
+    namespace = {"__cls": dataclass_type}
+
+    lines = []
+    for i, field in enumerate(dataclass_fields):
+        lines += [f"f{i} = self.{field.name}", f"n{i} = None"]
+
+    lines.append("for path, value in updates:")
+    for i, field in enumerate(dataclass_fields):
+        if field.default is not MISSING:
+            namespace[f"__default_{i}"] = field.default
+            removed = f"f{i} = __default_{i}"
+        elif field.default_factory is not MISSING:
+            namespace[f"__factory_{i}"] = field.default_factory
+            removed = f"f{i} = __factory_{i}()"
+        else:
+            removed = "return ContextMixin._merge(self, updates)"
+        lines += [
+            f"    {'elif' if i else 'if'} path[0] == {field.name!r}:",
+            "        if len(path) > 1:",
+            f"            n{i} = n{i} or []",
+            f"            n{i}.append((path[1:], value))",
+            "            continue",
+            "        elif value is REMOVED:",
+            f"            {removed}",
+            "        else:",
+            f"            f{i} = value",
+            f"        n{i} = None",
+        ]
+    lines += [f"    {'else:' if dataclass_fields else 'if path:'}", "        return ContextMixin._merge(self, updates)"]
+
+    for i in range(len(dataclass_fields)):
+        lines += [f"if n{i}:", f"    f{i} = apply_updates(f{i}, n{i}, REMOVED)"]
+
+    if construct_directly:
+        lines.append("new = object.__new__(__cls)")
+        lines += [f"object.__setattr__(new, {field.name!r}, f{i})" for i, field in enumerate(dataclass_fields)]
+        lines.append("return new")
+    else:
+        arguments = ", ".join(f"{field.name}=f{i}" for i, field in enumerate(dataclass_fields) if field.init)
+        lines.append(f"return __cls({arguments})")
+
+    source = "\n".join(
+        [f"def __create_fn__({', '.join(namespace)}):", "  def _merge(self, updates):"]
+        + [f"    {line}" for line in lines]
+        + ["  return _merge"]
+    )
+    created = {}
+    exec(source, globals(), created)
+    merge = created["__create_fn__"](**namespace)
+    merge.__qualname__ = f"{dataclass_type.__qualname__}._merge"
+    return merge
+
+
 class DataclassMixinMeta(type):
-    def __new__(cls, *args, use_dataclass=dataclass, **kwargs):
-        new_cls = super().__new__(cls, *args, **kwargs)
-        as_dataclass = use_dataclass(new_cls)
+    """
+    Turns the class into a dataclass with `use_dataclass`.
+
+    With `frozen=True`, scopes cannot be changed after creation, and with `slots=True` they have no __dict__,
+    which makes them smaller and attribute reads faster:
+
+        class Settings(Context, frozen=True, slots=True):
+            ...
+
+    Subclasses of frozen contexts are frozen as well.
+
+    Root classes of the library, like Context, are created with `root=True` and stay plain classes, as dataclasses
+    cannot be both frozen and non-frozen subclasses of the same dataclass.
+    """
+
+    def __new__(cls, name, bases, namespace, use_dataclass=dataclass, frozen=None, slots=False, root=False, **kwargs):
+        new_cls = super().__new__(cls, name, bases, namespace, **kwargs)
+        if "__dataclass_fields__" in namespace:
+            # Class recreated by dataclass(slots=True), completed by the call that created the original class
+            return new_cls
+
+        if root:
+            type.__setattr__(new_cls, "_slot_defaults", {})
+            type.__setattr__(new_cls, "_initialized", True)
+            return new_cls
+
+        if frozen is None:
+            frozen = any(is_dataclass(base) and base.__dataclass_params__.frozen for base in bases)
+        options = {option: True for option, value in (("frozen", frozen), ("slots", slots)) if value}
+        as_dataclass = use_dataclass(new_cls, **options)
+
+        # dataclass keeps an __init__ defined in the class body, which must not be bypassed
+        construct_directly = (
+            use_dataclass is dataclass and "__init__" not in namespace and not hasattr(as_dataclass, "__post_init__")
+        )
+        type.__setattr__(as_dataclass, "_merge", merge_function(as_dataclass, construct_directly))
+        type.__setattr__(as_dataclass, "_slot_defaults", {
+            field.name: field.default for field in fields(as_dataclass) if field.default is not MISSING
+        })
+        type.__setattr__(as_dataclass, "_initialized", True)
         return as_dataclass
 
     def __getattribute__(self, item):
-        if item in ("_current_scope", "_class_identifier"):
+        if item.startswith("__") or item in ("_current_scope", "_class_identifier", "_scope_storage", "_merge_cache"):
             return super().__getattribute__(item)
         current_scope = self._current_scope()
         if not current_scope:
-            return super().__getattribute__(item)
+            value = super().__getattribute__(item)
+            if type(value) is MemberDescriptorType:
+                # Slotted dataclasses have no class attributes for the field defaults
+                return type.__getattribute__(self, "_slot_defaults").get(item, value)
+            return value
         return getattr(current_scope, item)
 
     def __setattr__(self, key, value):
         """
         Only support setting attributes on initialization.
         """
-        frame = inspect.currentframe()
-        while frame:
-            if frame.f_code.co_qualname == f"DataclassMixinMeta.__new__":
-                super().__setattr__(key, value)
-                break
-            frame = frame.f_back
-        else:
+        if "_initialized" in type.__getattribute__(self, "__dict__"):
             raise RuntimeError("Set context values only in context manager set() method")
+        super().__setattr__(key, value)
 
 
 class ContextMixin(IdentifiedClass):
+    __slots__ = ()
+
+    _scope_storage = None
+    _merge_cache = None
+
+    def __init_subclass__(cls, storage=None, merge_cache=None, **kwargs):
+        """
+        Every Context class gets its own scope stack. The storage backend is inherited unless given with the
+        `storage` class keyword. With `storage=ContextVarStorage`, asyncio tasks see the scopes active where they
+        were created, instead of the scopes of the frames that run them, see `cntxt.storage`.
+
+        `merge_cache=<maxsize>` enables reusing the merged scope when the same values are set on the same parent
+        scope again, e.g. in a loop. The setting is inherited, and `merge_cache=0` disables it.
+        """
+        super().__init_subclass__(**kwargs)
+        if "_scope_storage" in cls.__dict__:
+            # Class recreated by dataclass(slots=True), keeps the settings of the original class, with the storage
+            # keyed by the final class, so that captured scopes refer to a class that can be pickled
+            cls._scope_storage = type(cls._scope_storage)(cls._class_identifier())
+            return
+
+        if storage is None:
+            storage = type(cls._scope_storage) if cls._scope_storage else FrameStorage
+        cls._scope_storage = storage(cls._class_identifier())
+
+        if merge_cache is None:
+            merge_cache = cls._merge_cache.maxsize if cls._merge_cache else 0
+        cls._merge_cache = MergeCache(merge_cache) if merge_cache else None
 
     @classmethod
     @contextmanager
     def set(cls, **ctx):
-        return cls._wrap_context_frame(**ctx)
+        return cls._wrap_context_frame(compile_updates(ctx))
+
+    @classmethod
+    @asynccontextmanager
+    async def aset(cls, **ctx):
+        """
+        Same as `set()`, for coroutines:
+
+            async with Ctx.aset(a=1):
+                await ...
+
+        The scope is kept in the frame of the calling coroutine, so other asyncio tasks do not see it while the
+        coroutine waits.
+        """
+        updates = compile_updates(ctx)
+        storage = cls._scope_storage
+        token = storage.push_local(
+            inspect.currentframe().f_back.f_back,
+            lambda prev_context: cls._merge_scope(prev_context, updates),
+        )
+        try:
+            yield
+        finally:
+            storage.pop(token)
+
+    @classmethod
+    def prepare(cls, **keys):
+        """
+        Returns a reusable UpdatePlan for the given keys, with the given values as defaults. Keys are parsed only
+        once, which helps with set() calls in hot loops:
+
+            duration = Animation.prepare(duration=DEFAULT_DURATION)
+            for d in durations:
+                with duration.set(duration=d):
+                    ...
+        """
+        return UpdatePlan(cls, keys)
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Returns the effective values of the current scope as an immutable object that can be held in a loop or
+        passed to other threads without further lookups.
+
+        Dataclass contexts return a namedtuple with the context fields, dict contexts a read-only mapping. Values
+        themselves are not copied.
+        """
+        scope = cls._current_scope()
+        if scope is None:
+            scope = cls()
+        if isinstance(scope, dict):
+            return MappingProxyType(dict(scope))
+        return snapshot_type(type(scope))(*(getattr(scope, field.name) for field in fields(scope)))
+
+    @classmethod
+    def merge_cache_info(cls):
+        """
+        Returns hit and miss counts of the merge cache, or None if the class has no merge cache.
+        """
+        return cls._merge_cache and cls._merge_cache.info()
 
     @classmethod
     def wrap(cls, func, **ctx):
-        def wrapper(*args, **kwargs):
-            with cls.set(**ctx):
-                return func(*args, **kwargs)
+        """
+        Returns a function that calls `func` in a scope with the given values.
 
+        Wrapping a function already wrapped by the same class fuses the wraps, so that every call enters a single
+        scope with the updates of the outer wrap applied before the updates of the inner one.
+
+        Coroutine functions and async generator functions get an async wrapper, where the scope is merged once per
+        call and stays active whenever the coroutine or generator runs, but not while it is suspended.
+        """
+        updates = compile_updates(ctx)
+        wrapped = getattr(func, "_cntxt_wrapped", None)
+        # functools.wraps copies the marker to decorators around the wrapper, which must not be fused away
+        if wrapped and wrapped[0] is func and wrapped[1] is cls:
+            _, _, func, inner_updates = wrapped
+            updates += inner_updates
+
+        storage = cls._scope_storage
+
+        def merge(prev_context):
+            return cls._merge_scope(prev_context, updates)
+
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                # The scope is kept in the frame of this coroutine, which runs the wrapped one on every resume
+                token = storage.push_local(inspect.currentframe(), merge)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    storage.pop(token)
+
+        elif inspect.isasyncgenfunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                frame = inspect.currentframe()
+                scope = merge(cls._current_scope())
+
+                def enter(prev_context):
+                    return scope
+
+                # Pushed for every step only, as the code iterating the generator would otherwise see the scope
+                # between the steps with ContextVarStorage
+                generator = func(*args, **kwargs)
+                resume, value = generator.asend, None
+                while True:
+                    token = storage.push_local(frame, enter)
+                    try:
+                        item = await resume(value)
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        storage.pop(token)
+                    try:
+                        resume, value = generator.asend, (yield item)
+                    except GeneratorExit:
+                        token = storage.push_local(frame, enter)
+                        try:
+                            await generator.aclose()
+                        finally:
+                            storage.pop(token)
+                        raise
+                    except BaseException as error:
+                        resume, value = generator.athrow, error
+
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                token = storage.push(inspect.currentframe(), merge)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    storage.pop(token)
+
+        wrapper._cntxt_wrapped = wrapper, cls, func, updates
         return wrapper
 
     @classmethod
-    def _wrap_context_frame(cls, **ctx):
-        current_frame = frame = inspect.currentframe().f_back.f_back
-        while frame:
-            if context_stack := frame.f_locals.get(cls._class_identifier()):
-                break
-            frame = frame.f_back
-        else:
-            frame = current_frame
-            context_stack = ContextStack()
+    def capture(cls):
+        """
+        Returns a token for the current scope, to make it current again with `restore()`, e.g. in a callback or
+        another thread:
 
-        prev_context: Self = context_stack and context_stack[-1] or cls()
-        updated_context = prev_context._merge(ctx)
-        context_stack.append(updated_context)
-        frame.f_locals[cls._class_identifier()] = context_stack
+            token = Ctx.capture()
+            ...
+            with Ctx.restore(token):
+                ...
 
-        yield
+        The token refers to the scope itself, nothing is copied.
+        """
+        return ScopeToken(cls, cls._current_scope())
+
+    @classmethod
+    @contextmanager
+    def restore(cls, token):
+        """
+        Makes the scope captured with `capture()` the current scope for the duration of the with block, without
+        merging it with the scopes of the calling code.
+        """
+        if token.context_class is not cls:
+            raise TypeError(f"Token was captured for {token.context_class.__qualname__}, not {cls.__qualname__}")
+        scope = token.scope
+        return cls._enter_scope(lambda prev_context: scope)
+
+    @classmethod
+    def _wrap_context_frame(cls, updates):
+        return cls._enter_scope(lambda prev_context: cls._merge_scope(prev_context, updates))
 
-        context_stack.pop()
-        if not context_stack:
-            del frame.f_locals[cls._class_identifier()]
+    @classmethod
+    def _enter_scope(cls, update):
+        token = cls._scope_storage.push(inspect.currentframe().f_back.f_back, update)
+        try:
+            yield
+        finally:
+            cls._scope_storage.pop(token)
 
+    @classmethod
+    def _merge_scope(cls, prev_context, updates):
+        if cls._merge_cache is None:
+            return (prev_context or cls())._merge(updates)
+        return cls._merge_cache.get(prev_context, updates, lambda: (prev_context or cls())._merge(updates))
 
-    def _merge(self, ctx):
+    def _merge(self, updates):
         if is_dataclass(self):
-            new_dict = update_dict(asdict(self), **ctx)
+            new_dict = apply_updates(field_dict(self), updates, REMOVED)
         elif isinstance(self, dict):
-            new_dict = update_dict(self, **ctx)
+            new_dict = apply_updates(self, updates, REMOVED)
         else:
             raise TypeError(f"Context class is not a dict or a dataclass but {type(self)}")
 
@@ -264,25 +602,52 @@ class ContextMixin(IdentifiedClass):
 
         return new_context
 
-
     @classmethod
     def _current_scope(cls) -> Self | None:
-        frame = inspect.currentframe()
-        while frame:
-            context_stack = frame.f_locals.get(cls._class_identifier())
-            if context_stack:
-                return context_stack[-1]
-            frame = frame.f_back
-        return None
+        return cls._scope_storage.current()
+
+
+class ScopeToken:
+    """
+    Scope of a Context class, captured with `Ctx.capture()`.
+    """
+
+    __slots__ = "context_class", "scope"
+
+    def __init__(self, context_class, scope):
+        self.context_class = context_class
+        self.scope = scope
+
+
+class UpdatePlan:
+    """
+    Precompiled updates for a Context class, created with `Ctx.prepare()`.
+    """
 
+    def __init__(self, context_class, defaults):
+        self.context_class = context_class
+        self.plan = tuple((key, parse_key(key), value) for key, value in defaults.items())
 
-class Context(ContextMixin, metaclass=DataclassMixinMeta):
+    @contextmanager
+    def set(self, **values):
+        """
+        Same as `Ctx.set()`, for the prepared keys only. Keys that are not given use the prepared values.
+        """
+        updates = tuple((path, values.pop(key, default)) for key, path, default in self.plan)
+        if values:
+            raise TypeError(f"Keys not prepared: {', '.join(values)}")
+        return self.context_class._wrap_context_frame(updates)
+
+
+class Context(ContextMixin, metaclass=DataclassMixinMeta, root=True):
     """
     Default Context class.
 
-    Is also a dataclass, with all the associated behavior.
+    Subclasses are dataclasses, with all the associated behavior. Subclass with `frozen=True, slots=True` for
+    immutable scopes without a __dict__.
     """
-    pass
+
+    __slots__ = ()
 
 
 class DictContext(ContextMixin, metaclass=DictMixinMeta):
@@ -294,3 +659,23 @@ class context(dict, DictContext):
     Default convenience dict-based context
     """
     pass
+
+
+def capture_all() -> Scopes:
+    """
+    Returns the current scopes of all Context classes, Stacks and dynamic() values, to make them current again
+    with `restore_all()`. Scopes are not copied.
+    """
+    return capture(inspect.currentframe().f_back)
+
+
+def restore_all(scopes: Scopes):
+    """
+    Makes the scopes captured with `capture_all()` current for the duration of the with block:
+
+        scopes = capture_all()
+        ...
+        with restore_all(scopes):
+            ...
+    """
+    return scopes.restore()
@@ -0,0 +1,61 @@
+"""
+Memoization of scope merges.
+"""
+
+import threading
+from collections import OrderedDict
+from collections import namedtuple
+
+
+CacheInfo = namedtuple("CacheInfo", "hits misses uncacheable maxsize currsize")
+
+
+class MergeCache:
+    """
+    Bounded LRU cache of merged scopes, keyed by the identity of the parent scope and the update values.
+
+    Entries keep a reference to the parent scope, so its id cannot be reused while the entry exists. Updates with
+    unhashable values are not cached.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.uncacheable = 0
+
+    def get(self, parent, updates, merge):
+        """
+        Returns the cached result for merging updates into parent, calling merge() on a cache miss.
+        """
+        key = (id(parent), tuple((path, type(value), value) for path, value in updates))
+        try:
+            hash(key)
+        except TypeError:
+            self.uncacheable += 1
+            return merge()
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        merged = merge()
+
+        with self.lock:
+            self.entries[key] = (parent, merged)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+        return merged
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.uncacheable, self.maxsize, len(self.entries))
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = self.uncacheable = 0
@@ -0,0 +1,174 @@
+"""
+Copy policies for values in dynamic() structures.
+
+By default, a mutation of a dynamic() structure stores a deep copy of the whole structure. Large buffers like
+bytes, NumPy arrays or memoryviews do not need to be copied every time, so types can be registered with a policy:
+
+- SHARE: the value is never copied, all copies refer to the same object
+- READ_ONLY_VIEW: copies refer to a read-only memoryview of the value
+- COPY_ON_WRITE: copies share the value until it is mutated through the dynamic structure
+- DEEP_COPY: the value is deep copied, the default for types that do not support the buffer protocol
+
+    from cntxt.copying import SHARE
+    from cntxt.copying import register_copy_policy
+
+    register_copy_policy(MyLargeTable, SHARE)
+
+Types supporting the buffer protocol default to COPY_ON_WRITE, except for bytes, which is shared, and memoryview,
+which is copied as a read-only view. Single values can be shared with `cntxt.ref(value)`.
+"""
+
+import copy
+from enum import Enum
+
+from cntxt.proxies import ObjectProxy
+
+
+class CopyPolicy(Enum):
+    SHARE = "share"
+    READ_ONLY_VIEW = "read_only_view"
+    COPY_ON_WRITE = "copy_on_write"
+    DEEP_COPY = "deep_copy"
+
+
+SHARE = CopyPolicy.SHARE
+READ_ONLY_VIEW = CopyPolicy.READ_ONLY_VIEW
+COPY_ON_WRITE = CopyPolicy.COPY_ON_WRITE
+DEEP_COPY = CopyPolicy.DEEP_COPY
+
+ATOMIC_TYPES = frozenset((int, float, complex, bool, str, type(None)))
+
+
+class ref(ObjectProxy):
+    """
+    Marks a value in a dynamic() structure to be shared instead of copied:
+
+        dyn["table"] = ref(large_table)
+
+    Behaves like the value, which is available as `__subject__`. Only dynamic() values unwrap refs. Context scopes
+    do not copy values, so a ref set in a Context scope is kept as is and is not needed there.
+    """
+
+    __slots__ = ()
+
+    def __getattribute__(self, attr, oga=object.__getattribute__):
+        if attr in ("__copy__", "__deepcopy__"):
+            return oga(self, attr)
+        return super().__getattribute__(attr)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def dereference(value):
+    """
+    Returns the value marked with `ref()`, or the value itself if it is not a ref.
+    """
+    return object.__getattribute__(value, "__subject__") if type(value) is ref else value
+
+
+registered_policies = {
+    bytes: SHARE,
+    memoryview: READ_ONLY_VIEW,
+    bytearray: COPY_ON_WRITE,
+    ref: SHARE,
+}
+resolved_policies = {}
+
+
+def register_copy_policy(value_type, policy: CopyPolicy):
+    """
+    Sets the copy policy for instances of a type and its subclasses.
+    """
+    registered_policies[value_type] = CopyPolicy(policy)
+    resolved_policies.clear()
+
+
+def copy_policy(value) -> CopyPolicy:
+    """
+    Returns the copy policy for a value, resolved once per type.
+    """
+    value_type = type(value)
+    try:
+        return resolved_policies[value_type]
+    except KeyError:
+        pass
+
+    policy = next((registered_policies[base] for base in value_type.__mro__ if base in registered_policies), None)
+    if policy is None:
+        try:
+            memoryview(value).release()
+            policy = COPY_ON_WRITE
+        except TypeError:
+            policy = DEEP_COPY
+    resolved_policies[value_type] = policy
+    return policy
+
+
+def read_only_view(value):
+    """
+    Returns a read-only memoryview of the value, or the value itself if it is one already.
+    """
+    if type(value) is memoryview and value.readonly:
+        return value
+    return memoryview(value).toreadonly()
+
+
+def visible_value(value):
+    """
+    Returns the value as seen through dynamic(): a read-only view for values with the READ_ONLY_VIEW policy, the
+    value itself otherwise.
+    """
+    return read_only_view(value) if copy_policy(value) is READ_ONLY_VIEW else value
+
+
+def shallow_copy(value):
+    """
+    Returns a shallow copy of the value for mutation, the value itself if its copy policy is SHARE, or a read-only
+    view if it is READ_ONLY_VIEW.
+    """
+    policy = copy_policy(value)
+    if policy is SHARE:
+        return value
+    if policy is READ_ONLY_VIEW:
+        return read_only_view(value)
+    return copy.copy(value)
+
+
+def deepcopy(value, detach=False):
+    """
+    Deep copies the value, except for the values whose copy policy is not DEEP_COPY.
+
+    Values that are shared or viewed are found first and given to copy.deepcopy as already copied. With `detach`,
+    values with the COPY_ON_WRITE policy are copied as well, so that the copy shares no mutable values with the
+    original.
+    """
+    memo = {}
+    seen = set()
+    to_visit = [value]
+    while to_visit:
+        node = to_visit.pop()
+        node_type = type(node)
+        if node_type in ATOMIC_TYPES or id(node) in seen:
+            continue
+        seen.add(id(node))
+
+        policy = copy_policy(node)
+        if policy is READ_ONLY_VIEW:
+            memo[id(node)] = read_only_view(node)
+        elif policy is COPY_ON_WRITE and detach:
+            continue  # Left to copy.deepcopy
+        elif policy is not DEEP_COPY:
+            memo[id(node)] = node
+        else:
+            if isinstance(node, dict):
+                to_visit.extend(node.values())
+            elif isinstance(node, (list, tuple, set, frozenset)):
+                to_visit.extend(node)
+            if hasattr(node, "__dict__"):
+                to_visit.extend(vars(node).values())
+
+    return copy.deepcopy(value, memo)
@@ -0,0 +1,235 @@
+"""
+Executors that run the submitted functions with the scopes that were active when they were submitted:
+
+    from cntxt.futures import ThreadPoolExecutor
+
+    with Ctx.set(a=1), ThreadPoolExecutor() as executor:
+        executor.submit(func)  # func sees Ctx.a == 1
+
+With the standard executors, functions run without the scopes of the submitting code.
+
+ProcessPoolExecutor pickles the scopes once per distinct snapshot, with pickle protocol 5, into shared memory named
+by a hash of the content. Tasks only carry the name, and workers unpickle each snapshot once. Large values that
+support out-of-band pickling, like bytearrays and NumPy arrays, are stored as raw buffers next to the pickle data.
+"""
+
+import concurrent.futures
+import hashlib
+import inspect
+import pickle
+import secrets
+import struct
+import threading
+import weakref
+from collections import Counter
+from collections import OrderedDict
+from multiprocessing.shared_memory import SharedMemory
+
+from cntxt.scopes import Scopes
+from cntxt.scopes import capture
+
+
+SNAPSHOT_CACHE_SIZE = 128
+WORKER_CACHE_SIZE = 128
+
+
+class ThreadPoolExecutor(concurrent.futures.ThreadPoolExecutor):
+    """
+    Drop-in replacement for concurrent.futures.ThreadPoolExecutor that captures the scopes at submit() and map()
+    time and makes them active in the worker thread.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        if hasattr(fn, "_cntxt_scopes"):
+            # Already bound to captured scopes, e.g. by map()
+            return super().submit(fn, *args, **kwargs)
+        return super().submit(capture(inspect.currentframe().f_back).run, fn, *args, **kwargs)
+
+    def map(self, fn, *iterables, timeout=None, chunksize=1):
+        """
+        Same as Executor.map(), with the scopes captured once for all calls.
+        """
+        scoped = capture(inspect.currentframe().f_back).bind(fn)
+        return super().map(scoped, *iterables, timeout=timeout, chunksize=chunksize)
+
+
+class ProcessPoolExecutor(concurrent.futures.ProcessPoolExecutor):
+    """
+    Drop-in replacement for concurrent.futures.ProcessPoolExecutor that makes the scopes active at submit() time
+    active in the worker process. map() captures the scopes once per chunk.
+
+    Scope values and Context classes must be picklable. Other contextvars are not sent to the workers. Stack and
+    dynamic() values are matched by type name, so with the spawn start method, those created for types defined in
+    the __main__ script are not found in the workers.
+
+    The last SNAPSHOT_CACHE_SIZE snapshots are kept in shared memory, and older ones are released once the tasks
+    using them are done. Workers keep the last WORKER_CACHE_SIZE snapshots they have used. All shared memory is
+    released on shutdown(wait=True), or when the executor is garbage collected.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._segment_prefix = f"cntxt{secrets.token_hex(3)}"
+        self._segments = {}
+        # Segment name to the number of cached snapshots and pending tasks using it
+        self._segment_users = Counter()
+        self._snapshots = {}
+        self._segments_lock = threading.Lock()
+        self._release_segments = weakref.finalize(self, release_segments, self._segments)
+
+    def submit(self, fn, /, *args, **kwargs):
+        token = self._share(capture(inspect.currentframe().f_back))
+        try:
+            future = super().submit(run_in_scopes, token, fn, *args, **kwargs)
+        except BaseException:
+            self._release(token)
+            raise
+        future.add_done_callback(lambda _: self._release(token))
+        return future
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        super().shutdown(wait=wait, cancel_futures=cancel_futures)
+        if wait:
+            self._release_segments()
+
+    def _share(self, scopes):
+        """
+        Returns the name of the shared memory segment holding the pickled scopes, creating it if needed, and
+        counts a task using it until `_release()`.
+        """
+        items = scopes.items()
+        # Snapshots are recognized by the identity of the scopes, which are kept alive by the cache entry
+        snapshot = tuple((key, id(scope)) for key, scope in items)
+        with self._segments_lock:
+            if entry := self._snapshots.get(snapshot):
+                self._segment_users[entry[0]] += 1
+                return entry[0]
+
+        buffers = []
+        data = pickle.dumps(items, protocol=5, buffer_callback=buffers.append)
+        chunks = [data, *(buffer.raw() for buffer in buffers)]
+        digest = hashlib.blake2b(digest_size=8)
+        for chunk in chunks:
+            digest.update(chunk)
+        name = f"{self._segment_prefix}{digest.hexdigest()}"
+
+        with self._segments_lock:
+            if name not in self._segments:
+                self._segments[name] = write_segment(name, chunks)
+            if snapshot not in self._snapshots:
+                if len(self._snapshots) >= SNAPSHOT_CACHE_SIZE:
+                    evicted_name, _ = self._snapshots.pop(next(iter(self._snapshots)))
+                    self._release_locked(evicted_name)
+                self._snapshots[snapshot] = name, items
+                self._segment_users[name] += 1
+            self._segment_users[name] += 1
+        return name
+
+    def _release(self, name):
+        with self._segments_lock:
+            self._release_locked(name)
+
+    def _release_locked(self, name):
+        """
+        Drops one user of the segment, and unlinks the segment when its snapshot has been evicted and the tasks
+        using it are done.
+        """
+        self._segment_users[name] -= 1
+        if self._segment_users[name] <= 0:
+            del self._segment_users[name]
+            segment = self._segments.pop(name, None)
+            if segment is not None:
+                segment.close()
+                segment.unlink()
+
+
+def write_segment(name, chunks):
+    """
+    Writes the chunks to a new shared memory segment, after a header with the count and lengths of the chunks.
+    """
+    lengths = [memoryview(chunk).nbytes for chunk in chunks]
+    header = struct.pack(f"<Q{len(lengths)}Q", len(lengths), *lengths)
+    segment = SharedMemory(name, create=True, size=len(header) + sum(lengths))
+    offset = 0
+    for chunk in (header, *chunks):
+        chunk = memoryview(chunk).cast("B")
+        segment.buf[offset:offset + chunk.nbytes] = chunk
+        offset += chunk.nbytes
+    return segment
+
+
+def read_segment(name):
+    """
+    Returns the segment and the chunks written to it by write_segment(), as read-only views of the segment.
+    """
+    # Workers share the resource tracker of the executor process, which registered the segment when creating it
+    # before starting them, so attaching needs no unregistering
+    segment = SharedMemory(name)
+    count, = struct.unpack_from("<Q", segment.buf)
+    lengths = struct.unpack_from(f"<{count}Q", segment.buf, 8)
+    view = segment.buf.toreadonly()
+    offset = 8 * (count + 1)
+    chunks = []
+    for length in lengths:
+        chunks.append(view[offset:offset + length])
+        offset += length
+    return segment, chunks
+
+
+def release_segments(segments):
+    for segment in segments.values():
+        segment.close()
+        segment.unlink()
+    segments.clear()
+
+
+# Scopes unpickled in a worker process, by segment name, least recently used first
+worker_scopes = OrderedDict()
+# Segments evicted from worker_scopes that could not be closed yet, see close_retired_segments()
+retired_segments = []
+
+
+def run_in_scopes(token, fn, /, *args, **kwargs):
+    """
+    Runs fn in a worker process with the scopes stored in the named segment.
+    """
+    try:
+        scopes = worker_scopes[token][2]
+        worker_scopes.move_to_end(token)
+    except KeyError:
+        scopes = load_scopes(token)
+    return scopes.run(fn, *args, **kwargs)
+
+
+def load_scopes(token):
+    """
+    Unpickles the scopes in the named segment and caches them, evicting the least recently used scopes beyond
+    WORKER_CACHE_SIZE.
+    """
+    segment, (data, *buffers) = read_segment(token)
+    scopes = Scopes.from_items(pickle.loads(data, buffers=buffers))
+    data.release()
+    # The segment is kept open, as unpickled values can refer to its buffers
+    worker_scopes[token] = segment, buffers, scopes
+
+    if len(worker_scopes) > WORKER_CACHE_SIZE:
+        _, (segment, buffers, _) = worker_scopes.popitem(last=False)
+        retired_segments.append((segment, buffers))
+        close_retired_segments()
+    return scopes
+
+
+def close_retired_segments():
+    """
+    Closes the evicted segments, except those with buffers still used by unpickled values, e.g. NumPy arrays, which
+    are tried again on the next eviction.
+    """
+    still_used = []
+    for segment, buffers in retired_segments:
+        try:
+            for buffer in buffers:
+                buffer.release()
+            segment.close()
+        except BufferError:
+            still_used.append((segment, buffers))
+    retired_segments[:] = still_used
@@ -0,0 +1,253 @@
+"""
+Opt-in instrumentation for attributing cntxt overhead.
+
+    from cntxt import instrumentation
+
+    instrumentation.enable()
+    ...
+    instrumentation.stats()  # {"app.Ctx": {"lookups": 10, "lookup_depth": {8: 6, 16: 4}, ...}, ...}
+    instrumentation.reset()
+    instrumentation.disable()
+
+Statistics are kept per Context class, and per root type for dynamic() objects, by module-qualified name:
+
+- lookups, lookup_depth: number of scope lookups and a histogram of frames walked per lookup
+- merges, merge_time_us: number of scope merges and a histogram of merge durations in microseconds
+- copies, copy_bytes: number of copies and a histogram of copied bytes, as measured by sys.getsizeof
+- live_scopes: Context scopes currently entered
+
+Histogram keys are the upper bounds of power-of-two buckets.
+
+Enabling replaces the measured functions with instrumented versions, and disabling restores the originals, so
+there is no cost when instrumentation is disabled.
+"""
+
+import inspect
+import math
+import sys
+import threading
+import time
+from collections import Counter
+from collections import defaultdict
+from collections.abc import Mapping
+from collections.abc import Set
+
+import cntxt
+from cntxt import ContextMixin
+from cntxt.manager import Manager
+from cntxt.storage import ContextVarStorage
+from cntxt.storage import FrameStorage
+
+
+_lock = threading.Lock()
+_originals = {}
+_merging = threading.local()
+
+
+class Stats:
+    def __init__(self):
+        self.counters = Counter()
+        self.histograms = defaultdict(Counter)
+
+    def count(self, name, amount=1):
+        with _lock:
+            self.counters[name] += amount
+
+    def observe(self, count_name, histogram_name, value):
+        bucket = 0 if value <= 0 else 1 << (math.ceil(value) - 1).bit_length()
+        with _lock:
+            self.counters[count_name] += 1
+            self.histograms[histogram_name][bucket] += 1
+
+    def as_dict(self):
+        with _lock:
+            return dict(self.counters) | {
+                name: dict(sorted(histogram.items())) for name, histogram in self.histograms.items()
+            }
+
+
+_stats = defaultdict(Stats)
+
+
+def qualified_name(cls):
+    if cls.__module__ == "builtins":
+        return cls.__qualname__
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def owner_name(owner):
+    if isinstance(owner, Manager):
+        return f"dynamic({qualified_name(owner.root_type)})"
+    if isinstance(owner, type):
+        return qualified_name(owner)
+    return str(owner)
+
+
+def stats_for(owner):
+    return _stats[owner_name(owner)]
+
+
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, Mapping):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, Set)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+# Instrumented versions of the measured functions
+
+
+def frame_storage_current(original):
+    def current(self):
+        depth = 0
+        frame = inspect.currentframe()
+        while frame:
+            depth += 1
+            context_stack = frame.f_locals.get(self.key)
+            if context_stack:
+                break
+            frame = frame.f_back
+        stats_for(self.key).observe("lookups", "lookup_depth", depth)
+        return original(self)
+    return current
+
+
+def context_var_storage_current(original):
+    def current(self):
+        stats_for(self.key).observe("lookups", "lookup_depth", 0)
+        return original(self)
+    return current
+
+
+def storage_push(original):
+    def push(self, frame, update):
+        token = original(self, frame, update)
+        stats_for(self.key).count("live_scopes")
+        return token
+    return push
+
+
+def storage_pop(original):
+    def pop(self, token):
+        original(self, token)
+        stats_for(self.key).count("live_scopes", -1)
+    return pop
+
+
+def merge_scope(original):
+    def _merge_scope(cls, prev_context, updates):
+        _merging.owner = cls
+        start = time.perf_counter()
+        try:
+            return original.__func__(cls, prev_context, updates)
+        finally:
+            stats_for(cls).observe("merges", "merge_time_us", (time.perf_counter() - start) * 1e6)
+            _merging.owner = None
+    return classmethod(_merge_scope)
+
+
+def apply_updates(original):
+    def apply_updates(root, updates, removed):
+        result = original(root, updates, removed)
+        copied = {id(result): result}
+        for path, value in updates:
+            original_node, node = root, result
+            for key in path[:-1]:
+                try:
+                    original_node = cntxt.paths.get_child(original_node, key)
+                    node = cntxt.paths.get_child(node, key)
+                except (LookupError, AttributeError):
+                    break
+                if node is not original_node:
+                    copied[id(node)] = node
+        size = sum(sys.getsizeof(node) for node in copied.values())
+        stats_for(getattr(_merging, "owner", None) or "update_dict").observe("copies", "copy_bytes", size)
+        return result
+    return apply_updates
+
+
+def get_from_stack(original):
+    def get_from_stack(self, frame):
+        depth = 0
+        walked = frame
+        while walked:
+            depth += 1
+            if walked.f_locals.get(self.locals_key):
+                break
+            walked = walked.f_back
+        stats_for(self).observe("lookups", "lookup_depth", depth)
+        return original(self, frame)
+    return get_from_stack
+
+
+def copy_for_mutation(original):
+    def copy_for_mutation(self, stack_value, path):
+        start = time.perf_counter()
+        new_value, value_for_mutation = original(self, stack_value, path)
+        stats = stats_for(self)
+        stats.observe("merges", "merge_time_us", (time.perf_counter() - start) * 1e6)
+        if self.copy_on_write:
+            size = sys.getsizeof(new_value)
+            node = new_value
+            for key in path:
+                node = self.get_value_by_path(node, (key,))
+                size += sys.getsizeof(node)
+        else:
+            size = deep_size(new_value)
+        stats.observe("copies", "copy_bytes", size)
+        return new_value, value_for_mutation
+    return copy_for_mutation
+
+
+PROBES = (
+    (FrameStorage, "current", frame_storage_current),
+    (FrameStorage, "push", storage_push),
+    (FrameStorage, "push_local", storage_push),
+    (FrameStorage, "pop", storage_pop),
+    (ContextVarStorage, "current", context_var_storage_current),
+    (ContextVarStorage, "push", storage_push),
+    (ContextVarStorage, "push_local", storage_push),
+    (ContextVarStorage, "pop", storage_pop),
+    (ContextMixin, "_merge_scope", merge_scope),
+    (cntxt, "apply_updates", apply_updates),
+    (Manager, "get_from_stack", get_from_stack),
+    (Manager, "copy_for_mutation", copy_for_mutation),
+)
+
+
+def enable():
+    for owner, name, instrumented in PROBES:
+        if (owner, name) not in _originals:
+            original = vars(owner)[name]
+            _originals[owner, name] = original
+            setattr(owner, name, instrumented(original))
+
+
+def disable():
+    for (owner, name), original in _originals.items():
+        setattr(owner, name, original)
+    _originals.clear()
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def stats():
+    """
+    Returns the collected statistics as a dict keyed by the module-qualified name of the Context class or dynamic()
+    root type.
+    """
+    return {name: owner_stats.as_dict() for name, owner_stats in list(_stats.items())}
+
+
+def reset():
+    _stats.clear()
@@ -1,28 +1,65 @@
-import copy
 import inspect
+import itertools
 import threading
-from collections.abc import MutableMapping
-from collections.abc import MutableSequence
 from collections.abc import MutableSet
+from contextlib import contextmanager
 from typing import Any
 from typing import TypeVar
-
+from weakref import WeakSet
+from weakref import WeakValueDictionary
+
+from cntxt.copying import COPY_ON_WRITE
+from cntxt.copying import copy_policy
+from cntxt.copying import deepcopy
+from cntxt.copying import dereference
+from cntxt.copying import ref
+from cntxt.copying import shallow_copy
+from cntxt.copying import visible_value
 from cntxt.wrappers import DynamicObject
+from cntxt.wrappers import classify
+from cntxt.wrappers import set_value
 from cntxt.wrappers import wrap_target
 
 
 T = TypeVar("T")
 
 
+def has_copy_on_write_policy(value):
+    return copy_policy(value) is COPY_ON_WRITE
+
+
+# All managers, to find the ones affected when stack values are installed from outside, see stack_changed()
+managers = WeakSet()
+
+
+def stack_changed(locals_key):
+    """
+    Invalidates the cached subjects of the managers with the given frame locals key, after stack values have been
+    added or removed by other means than the managers themselves.
+    """
+    for manager in list(managers):
+        if manager.locals_key == locals_key:
+            manager.generation = next(manager.generations)
+
+
 class Manager:
 
     LOCK_TIMEOUT = 1.0
 
-    def __init__(self, initial_value, frame):
+    def __init__(self, initial_value, frame, copy_on_write=False, plain_leaves=False):
         self.initial_value = initial_value
         self.root_type = type(initial_value)
+        self.copy_on_write = copy_on_write
+        self.plain_leaves = plain_leaves
 
         self.start_of_block_scope_length = 0
+        self.proxies = WeakValueDictionary()
+        self.batches = {}  # Frame -> Batch, see batch()
+
+        # Changes whenever a stack value is added or removed, see DynamicObject.__subject__
+        self.generations = itertools.count()
+        self.generation = next(self.generations)
+        managers.add(self)
 
     @property
     def locals_key(self):
@@ -41,15 +78,27 @@ class Manager:
         return wrap_target(value, path, self)
 
     def mutate(self, frame, path, function_name, args, kwargs):
-        stack_value = self.get_from_stack(frame)
-        new_value = copy.deepcopy(stack_value)
-        value_for_mutation = self.get_value_by_path(new_value, path)
-        result = getattr(value_for_mutation, function_name)(*args, **kwargs)
-        self.add_to_stack(new_value, frame)
+        batch = self.batches.get(frame)
+        if batch is not None:
+            result = getattr(batch.value_for_mutation(path), function_name)(*args, **kwargs)
+            self.generation = next(self.generations)
+        else:
+            new_value, value_for_mutation = self.copy_for_mutation(self.get_from_stack(frame), path)
+            result = getattr(value_for_mutation, function_name)(*args, **kwargs)
+            self.add_to_stack(new_value, frame)
         return wrap_target(result, path, self)
 
+    def copy_for_mutation(self, stack_value, path):
+        """
+        Returns a copy of the stack value, and the value at path within the copy.
+        """
+        if self.copy_on_write:
+            return self.copy_path(stack_value, path)
+        return self.copy_path(deepcopy(stack_value), path, needs_copy=has_copy_on_write_policy)
+
     def add_to_stack(self, obj, frame):
         frame.f_locals.setdefault(self.locals_key, []).append(obj)
+        self.generation = next(self.generations)
 
     def get_from_stack(self, frame) -> Any | None:
         while frame:
@@ -61,18 +110,56 @@ class Manager:
         return self.initial_value
 
     @staticmethod
-    def get_value_by_path(obj, path: list):
-        path = path.copy()
-
-        while path:
-            key = path.pop(0)
-            if isinstance(obj, (MutableSequence, MutableMapping)):
-                obj = obj[key]
-            elif isinstance(obj, MutableSet):
+    def get_value_by_path(obj, path: tuple):
+        """
+        Returns the value at path, with values marked with ref() resolved to the marked values, and values with
+        the READ_ONLY_VIEW policy as read-only views.
+        """
+        obj = dereference(obj)
+        for key in path:
+            container = classify(type(obj)).container
+            if container is MutableSet:
                 obj = key
+            elif container:
+                obj = obj[key]
             else:
                 obj = object.__getattribute__(obj, key)
-        return obj
+            obj = dereference(obj)
+        return visible_value(obj)
+
+    @staticmethod
+    def get_child(node, key):
+        node = dereference(node)
+        container = classify(type(node)).container
+        if container is MutableSet:
+            return key
+        elif container:
+            return node[key]
+        return object.__getattribute__(node, key)
+
+    @staticmethod
+    def copy_path(obj, path: tuple, needs_copy=None):
+        """
+        Shallow copies the containers from obj down to the end of the path, sharing everything else with obj.
+
+        With `needs_copy`, only the values for which it returns True are copied. Values shared by their copy policy
+        are never copied.
+
+        Returns the copy of obj and the copy of the value at the end of the path. Values below a value marked with
+        ref() are shared, so the rest of the path is not copied.
+        """
+        root = node = obj if needs_copy and not needs_copy(obj) else shallow_copy(obj)
+
+        for i, key in enumerate(path):
+            if type(node) is ref:
+                return root, Manager.get_value_by_path(node, path[i:])
+            child = Manager.get_child(node, key)
+            child_copy = child if needs_copy and not needs_copy(child) else shallow_copy(child)
+            if child_copy is not child:
+                set_value(node, key, child, child_copy)
+            node = child_copy
+
+        return root, visible_value(dereference(node))
 
     def start_with_block(self, frame):
         previous_scopes = frame.f_locals.setdefault(self.locals_key, [])
@@ -81,22 +168,76 @@ class Manager:
     def end_with_block(self, frame):
         previous_scopes = frame.f_locals.setdefault(self.locals_key, [])
         frame.f_locals[self.locals_key] = previous_scopes[:self.start_of_block_scope_length]
+        self.generation = next(self.generations)
+
+
+class Batch:
+    """
+    Working copy of a dynamic value, shared by all mutations made in one frame within a batch() block.
+
+    The working copy is pushed to the frame's stack on the first mutation and then mutated in place. With copy on
+    write, and for values with the COPY_ON_WRITE copy policy, each value on a mutated path is copied once per batch,
+    the rest is shared with the previous value.
+    """
+
+    def __init__(self, manager, frame):
+        self.manager = manager
+        self.frame = frame
+        self.value = None
+        self.owned = {}  # Containers copied for this batch, by id
+        self.scope_length = len(frame.f_locals.get(manager.locals_key, ()))
+
+    def value_for_mutation(self, path):
+        manager = self.manager
+        if self.value is None:
+            self.value, _ = manager.copy_for_mutation(manager.get_from_stack(self.frame), ())
+            self.owned[id(self.value)] = self.value
+            manager.add_to_stack(self.value, self.frame)
+
+        node = self.value
+        for i, key in enumerate(path):
+            if type(node) is ref:
+                return manager.get_value_by_path(node, path[i:])
+            child = manager.get_child(node, key)
+            if id(child) not in self.owned and (manager.copy_on_write or has_copy_on_write_policy(child)):
+                child_copy = shallow_copy(child)
+                if child_copy is not child:
+                    set_value(node, key, child, child_copy)
+                    self.owned[id(child_copy)] = child = child_copy
+            node = child
+        return visible_value(dereference(node))
+
+    def rollback(self):
+        scopes = self.frame.f_locals.get(self.manager.locals_key)
+        if scopes is not None:
+            del scopes[self.scope_length:]
+            self.manager.generation = next(self.manager.generations)
 
 
 def dynamic(
     target: T,
+    copy_on_write: bool = False,
+    plain_leaves: bool = False,
 ) -> T:
     """
     Tag target data structure to get notified of any changes.
 
     Return value is a proxy type, but type hinted to match the tagged object for editor convenience.
+
+    By default, every mutation stores a deep copy of the whole structure. With `copy_on_write`, a mutation copies
+    only the containers on the mutated path and shares the rest with the previous value. Large buffers are shared
+    or copied according to their copy policy, see cntxt.copying.
+
+    With `plain_leaves`, immutable values within the structure, like numbers, strings, enum members and tuples of
+    those, are returned as plain values instead of proxies. Reading them is faster, but the returned values do not
+    follow later changes.
     """
     if type(target) is type:
         target = target()
 
     frame = inspect.currentframe().f_back
-    manager = Manager(target, frame)
-    wrapped = wrap_target(target, [], manager)
+    manager = Manager(target, frame, copy_on_write=copy_on_write, plain_leaves=plain_leaves)
+    wrapped = wrap_target(target, (), manager)
 
     return wrapped
 
@@ -106,9 +247,12 @@ def is_dynamic(obj):
 
 
 def fix(obj):
+    """
+    Returns a plain copy of the current value of a dynamic object, detached from the stack.
+    """
     if is_dynamic(obj):
         obj = obj.__subject__
-    return copy.deepcopy(obj)
+    return deepcopy(obj, detach=True)
 
 
 def start_block(obj):
@@ -123,6 +267,38 @@ def end_block(obj):
     obj._manager.end_with_block(inspect.currentframe().f_back.f_back)
 
 
+@contextmanager
+def batch(obj):
+    """
+    Applies all mutations of a dynamic object made directly in the calling function within the block to a single
+    working copy, and adds it to the stack once, instead of copying the whole value for every mutation:
+
+        with batch(dyn):
+            for i in range(1000):
+                dyn["items"].append(i)
+
+    Mutations made in called functions are scoped to those functions as usual. If the block raises an exception,
+    the mutations made in it are discarded.
+    """
+    if not is_dynamic(obj):
+        raise TypeError("Parameter has to be dynamic")
+    manager = obj._manager
+    frame = inspect.currentframe().f_back.f_back
+
+    if frame in manager.batches:
+        yield obj
+        return
+
+    manager.batches[frame] = current_batch = Batch(manager, frame)
+    try:
+        yield obj
+    except BaseException:
+        current_batch.rollback()
+        raise
+    finally:
+        del manager.batches[frame]
+
+
 class Stack:
     """Empty object container."""
     pass
@@ -0,0 +1,79 @@
+"""
+Helpers for updating nested values by path.
+
+Updates copy only the containers along each updated path, everything else is shared with the original.
+"""
+
+import copy
+from collections.abc import Mapping
+from collections.abc import Sequence
+from functools import lru_cache
+
+
+@lru_cache(maxsize=4096)
+def parse_key(key):
+    """
+    Parses a Django-like `a__b__0` key into a path tuple. Parsed paths are cached.
+
+    Example:
+        >>> parse_key("a__b__0")
+        ('a', 'b', 0)
+    """
+    return tuple(int(key_part) if key_part.isdigit() else key_part for key_part in key.split("__"))
+
+
+def compile_updates(updates):
+    """
+    Converts keyword updates to a tuple of (path, value) pairs for apply_updates.
+    """
+    return tuple((parse_key(key), value) for key, value in updates.items())
+
+
+def get_child(node, key):
+    if isinstance(node, (Mapping, Sequence)):
+        return node[key]
+    return getattr(node, key)
+
+
+def set_child(node, key, value):
+    if isinstance(node, (Mapping, Sequence)):
+        node[key] = value
+    else:
+        object.__setattr__(node, key, value)
+
+
+def remove_child(node, key):
+    try:
+        if isinstance(node, (Mapping, Sequence)):
+            node.pop(key)
+        else:
+            object.__delattr__(node, key)
+    except (IndexError, KeyError, AttributeError):
+        pass
+
+
+def apply_updates(root, updates, removed):
+    """
+    Applies (path, value) updates to a copy of root and returns the copy.
+
+    Containers along each path are copied once per call, and `removed` is the marker value for removing a key.
+    """
+    root = copy.copy(root)
+    copied = {id(root)}
+
+    for path, value in updates:
+        node = root
+        for key in path[:-1]:
+            child = get_child(node, key)
+            if id(child) not in copied:
+                child = copy.copy(child)
+                copied.add(id(child))
+                set_child(node, key, child)
+            node = child
+
+        if value is removed:
+            remove_child(node, path[-1])
+        else:
+            set_child(node, path[-1], value)
+
+    return root
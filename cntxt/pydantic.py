@@ -1,26 +1,99 @@
 from pydantic.dataclasses import dataclass
+from pydantic.dataclasses import is_pydantic_dataclass
 
+from cntxt import REMOVED
 from cntxt import ContextMixin
 from cntxt import DataclassMixinMeta
 from cntxt import Stack
+from cntxt.paths import apply_updates
+from cntxt.paths import compile_updates
+
+
+def delta_merge(self, updates):
+    """
+    Returns a copy of a pydantic dataclass instance with the updates applied, validating only the updated fields.
+
+    Values of the other fields are carried over as is, without re-validation. Nested updates to pydantic
+    dataclass values are merged the same way, other nested values are validated as a whole. Updates to unknown
+    fields and removing fields fall back to the full ContextMixin._merge.
+    """
+    field_names = type(self).__pydantic_fields__
+    values = {}
+    nested = {}
+    for path, value in updates:
+        name = path[0]
+        if name not in field_names:
+            return ContextMixin._merge(self, updates)
+        if len(path) > 1:
+            nested.setdefault(name, []).append((path[1:], value))
+        elif value is REMOVED:
+            return ContextMixin._merge(self, updates)
+        else:
+            values[name] = value
+            nested.pop(name, None)
+
+    new = object.__new__(type(self))
+    if hasattr(new, "__dict__"):
+        new.__dict__.update(self.__dict__)
+    else:
+        for name in field_names:
+            object.__setattr__(new, name, getattr(self, name))
+    validator = type(self).__pydantic_validator__
+    for name, value in values.items():
+        validator.validate_assignment(new, name, value)
+    for name, child_updates in nested.items():
+        child = getattr(new, name)
+        if is_pydantic_dataclass(type(child)):
+            object.__setattr__(new, name, delta_merge(child, child_updates))
+        else:
+            validator.validate_assignment(new, name, apply_updates(child, child_updates, REMOVED))
+    return new
 
 
 class PydanticStack(Stack):
+    """
+    Stack of pydantic dataclass scopes.
 
-    def __init__(self, stack_class=None):
+    With `delta_validation`, assignments validate only the assigned value instead of the whole scope.
+    """
+
+    def __init__(self, stack_class=None, delta_validation=False):
         super().__init__(stack_class=stack_class, dataclass_converter=dataclass)
+        object.__setattr__(self, "_delta_validation", delta_validation)
+
+    def _new_scope(self, frame, updates):
+        if object.__getattribute__(self, "_delta_validation"):
+            previous_scope = self._get_scope(frame)
+            if is_pydantic_dataclass(type(previous_scope)):
+                return delta_merge(previous_scope, compile_updates(updates))
+        return super()._new_scope(frame, updates)
 
 
 class PydanticDataclassMixinMeta(DataclassMixinMeta):
-    def __new__(cls, *args, **kwargs):
-        return super().__new__(cls, *args, use_dataclass=dataclass, **kwargs)
+    def __new__(cls, *args, delta_validation=None, **kwargs):
+        new_cls = super().__new__(cls, *args, use_dataclass=dataclass, **kwargs)
+        if delta_validation is None:
+            delta_validation = type.__getattribute__(new_cls, "_delta_validation")
+        type.__setattr__(new_cls, "_delta_validation", delta_validation)
+        if delta_validation:
+            type.__setattr__(new_cls, "_merge", delta_merge)
+        return new_cls
 
 
-class Context(ContextMixin, metaclass=PydanticDataclassMixinMeta):
+class Context(ContextMixin, metaclass=PydanticDataclassMixinMeta, root=True):
     """
     Pydantic Context class.
 
-    Is also a pydantic dataclass, with all the associated behavior and support for validation and
+    Subclasses are pydantic dataclasses, with all the associated behavior and support for validation and
     nested context updates.
+
+    By default, every set() validates the whole new scope. Subclass with `delta_validation=True` to validate
+    only the updated fields and nested paths, carrying over the already validated values of the other fields:
+
+        class Settings(Context, delta_validation=True):
+            ...
     """
-    pass
+
+    __slots__ = ()
+
+    _delta_validation = False
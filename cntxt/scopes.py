@@ -0,0 +1,157 @@
+"""
+Capturing the scopes active in a frame, to run code with the same scopes in another thread:
+
+    scopes = capture()
+    ...
+    scopes.run(func, *args)  # In another thread, func sees the captured Context, Stack and dynamic() values
+
+    with scopes.restore():  # Or the same in a with block
+        ...
+
+Covers Context and DictContext classes, Stacks and dynamic() values, as well as all contextvars, which hold the
+scopes of Context classes using ContextVarStorage.
+"""
+
+import contextvars
+import inspect
+from contextlib import contextmanager
+from functools import wraps
+
+from cntxt.manager import stack_changed
+from cntxt.storage import ContextStack
+from cntxt.storage import ContextVarStorage
+from cntxt.storage import context_var_storages
+
+
+STACK_KEY_PREFIX = "_dynascope_"
+
+
+def is_stack_key(key):
+    """
+    True for the frame locals keys of Stacks and dynamic() values.
+    """
+    return type(key) is str and key.startswith(STACK_KEY_PREFIX)
+
+
+def capture(frame=None):
+    """
+    Returns the scopes visible from the frame, by default the frame of the caller.
+
+    The call stack is walked once, and only the innermost scope of each Context class, Stack and dynamic() value is
+    kept.
+    """
+    frame = frame or inspect.currentframe().f_back
+    scopes = {}
+    while frame:
+        for key, value in frame.f_locals.items():
+            value_type = type(value)
+            if value_type is ContextStack or value_type is list and is_stack_key(key):
+                if value and key not in scopes:
+                    scopes[key] = value_type, value[-1]
+        frame = frame.f_back
+    return Scopes(
+        tuple((key, stack_type, scope) for key, (stack_type, scope) in scopes.items()),
+        contextvars.copy_context(),
+    )
+
+
+class Scopes:
+    """
+    Scopes captured with `capture()`, to be made current again with `run()` or `restore()`.
+
+    Scopes are held by reference, as they are not changed after creation. The same Scopes can be used to run
+    several functions, also concurrently.
+    """
+
+    __slots__ = "scopes", "context"
+
+    def __init__(self, scopes, context):
+        self.scopes = scopes
+        self.context = context
+
+    @classmethod
+    def from_items(cls, items):
+        """
+        Creates Scopes from the (key, scope) pairs returned by `items()`, e.g. after unpickling them in another
+        process. Other contextvars are not included.
+        """
+        scopes = []
+        context = contextvars.Context()
+        for key, scope in items:
+            storage = getattr(key, "_scope_storage", None)
+            if isinstance(storage, ContextVarStorage):
+                context.run(storage.variable.set, (scope, None))
+            else:
+                scopes.append((key, list if is_stack_key(key) else ContextStack, scope))
+        return cls(tuple(scopes), context)
+
+    def items(self):
+        """
+        Returns the captured scopes as (key, scope) pairs, where the keys are Context classes or the names of Stack
+        and dynamic() values. The pairs can be pickled if the scope values and Context classes can.
+        """
+        items = [(key, scope) for key, _, scope in self.scopes]
+        for variable, node in self.context.items():
+            storage = context_var_storages.get(variable)
+            if storage is not None and node is not None:
+                items.append((storage.key, node[0]))
+        return items
+
+    def run(self, func, /, *args, **kwargs):
+        """
+        Calls func with the captured scopes as the outermost scopes.
+        """
+        self.install(inspect.currentframe())
+        return self.context.copy().run(func, *args, **kwargs)
+
+    def install(self, frame):
+        """
+        Makes the captured scopes of Context classes, Stacks and dynamic() values the outermost scopes of a frame that
+        has none, e.g. the frame of a coroutine that has not started yet. Contextvars are not changed.
+        """
+        frame.f_locals.update((key, stack_type((scope,))) for key, stack_type, scope in self.scopes)
+
+    @contextmanager
+    def restore(self):
+        """
+        Makes the captured scopes the current scopes in the calling frame for the duration of the with block,
+        without merging or copying them.
+        """
+        frame = inspect.currentframe().f_back.f_back
+        frame_locals = frame.f_locals
+        restored = []
+        try:
+            for key, stack_type, scope in self.scopes:
+                if stack_type is ContextStack:
+                    storage = key._scope_storage
+                    restored.append((storage, storage.push(frame, lambda _, scope=scope: scope)))
+                else:
+                    scopes = frame_locals.setdefault(key, [])
+                    restored.append((key, len(scopes)))
+                    scopes.append(scope)
+                    stack_changed(key)
+            for variable, node in self.context.items():
+                if variable in context_var_storages:
+                    restored.append((variable, variable.set(node)))
+            yield
+        finally:
+            for owner, token in reversed(restored):
+                if isinstance(owner, str):
+                    # Stack.set() and dynamic() with blocks replace the list, so it is looked up again
+                    del frame.f_locals.get(owner, [])[token:]
+                    stack_changed(owner)
+                elif isinstance(owner, contextvars.ContextVar):
+                    owner.reset(token)
+                else:
+                    owner.pop(token)
+
+    def bind(self, func):
+        """
+        Returns a function that calls func with the captured scopes.
+        """
+        @wraps(func)
+        def scoped(*args, **kwargs):
+            return self.run(func, *args, **kwargs)
+
+        scoped._cntxt_scopes = self
+        return scoped
@@ -0,0 +1,133 @@
+"""
+Storage backends for the scope stacks of Context classes.
+
+A backend is selected per Context class with the `storage` class keyword:
+
+    class Ctx(Context, storage=ContextVarStorage):
+        a: int = None
+
+The backends differ with asyncio. With FrameStorage, a task sees the scopes of the frames that run it, e.g. those
+of the TaskGroup block, and not scopes entered between the TaskGroup and `create_task()`. With ContextVarStorage,
+a task sees the scopes that were active where `create_task()` was called, like with the cntxt `task_factory`.
+
+They also differ with sync generators, which have no contextvars of their own. With ContextVarStorage, a scope
+entered in a generator is seen by the code iterating it between the steps, and closing the suspended generator from
+another contextvars context raises ValueError and leaves the scope set in the original context. With FrameStorage,
+scopes entered in a generator stay in its frame.
+"""
+
+import inspect
+from contextvars import ContextVar
+from weakref import WeakValueDictionary
+
+
+class ContextStack(list):
+    pass
+
+
+# ContextVar to ContextVarStorage, to find the Context class of a variable in a captured contextvars context
+context_var_storages = WeakValueDictionary()
+
+
+class FrameStorage:
+    """
+    Default storage: the scope stack lives in the locals of the frame that entered the first scope, and lookups walk
+    the call stack to find it.
+    """
+
+    def __init__(self, key):
+        self.key = key
+
+    def current(self):
+        frame = inspect.currentframe()
+        while frame:
+            context_stack = frame.f_locals.get(self.key)
+            if context_stack:
+                return context_stack[-1]
+            frame = frame.f_back
+        return None
+
+    def push(self, frame, update):
+        """
+        Push the scope returned by `update(previous_scope)`, starting the lookup from the given frame.
+
+        Returns a token for `pop()`.
+        """
+        current_frame = frame
+        while frame:
+            if context_stack := frame.f_locals.get(self.key):
+                break
+            frame = frame.f_back
+        else:
+            frame = current_frame
+            context_stack = ContextStack()
+
+        context_stack.append(update(context_stack[-1] if context_stack else None))
+        frame.f_locals[self.key] = context_stack
+
+        return frame, context_stack
+
+    def push_local(self, frame, update):
+        """
+        Like `push()`, but the scope is pushed to a stack in the given frame, instead of the stack in the frame where
+        the outermost scope was entered. The scope is then only visible to code called from the frame, which for
+        the frame of a coroutine keeps it out of other asyncio tasks while the coroutine is suspended.
+        """
+        context_stack = frame.f_locals.get(self.key)
+        if context_stack:
+            previous = context_stack[-1]
+        else:
+            context_stack = ContextStack()
+            previous = None
+            outer_frame = frame.f_back
+            while outer_frame:
+                if outer_stack := outer_frame.f_locals.get(self.key):
+                    previous = outer_stack[-1]
+                    break
+                outer_frame = outer_frame.f_back
+
+        context_stack.append(update(previous))
+        frame.f_locals[self.key] = context_stack
+
+        return frame, context_stack
+
+    def pop(self, token):
+        frame, context_stack = token
+        context_stack.pop()
+        if not context_stack:
+            del frame.f_locals[self.key]
+
+
+class ContextVarStorage:
+    """
+    Scope stack kept in a ContextVar as linked (scope, parent) nodes, so lookups take constant time regardless of
+    the depth of the call stack.
+
+    New threads start without scopes. asyncio tasks see the scopes that were active where the task was created,
+    instead of the scopes of the frames that run the task, and scopes entered in sync generators are seen by the
+    code iterating them, see the module docstring.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.variable = ContextVar(f"cntxt_{getattr(key, '__qualname__', key)}", default=None)
+        context_var_storages[self.variable] = self
+
+    def current(self):
+        node = self.variable.get()
+        return None if node is None else node[0]
+
+    def push(self, frame, update):
+        """
+        Push the scope returned by `update(previous_scope)`. The frame is not needed by this backend.
+
+        Returns a token for `pop()`.
+        """
+        node = self.variable.get()
+        return self.variable.set((update(None if node is None else node[0]), node))
+
+    # Tasks have their own contextvars, so scopes are local to the task anyway
+    push_local = push
+
+    def pop(self, token):
+        self.variable.reset(token)
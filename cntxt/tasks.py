@@ -0,0 +1,32 @@
+"""
+asyncio task factory that makes the scopes of the code creating a task current in the task:
+
+    from cntxt.tasks import task_factory
+
+    async def main():
+        asyncio.get_running_loop().set_task_factory(task_factory)
+        with Ctx.set(a=1):
+            task = asyncio.create_task(worker())  # worker sees Ctx.a == 1, even after the with block has ended
+
+Without it, tasks see the scopes of the frames that run the event loop, and tasks of the same event loop share
+them. With the factory, the scopes are captured when the task is created and stored in the frame of its
+coroutine, so lookups in the task find them within a few frames regardless of the depth of the event loop, and
+scopes entered in one task are not visible to the others.
+
+Context classes with ContextVarStorage need no factory, as tasks copy the contextvars of the creating code.
+"""
+
+import asyncio
+import inspect
+
+from cntxt.scopes import capture
+
+
+def task_factory(loop, coro, **kwargs):
+    """
+    Task factory for `loop.set_task_factory()`, creates asyncio.Tasks with the current scopes.
+    """
+    frame = getattr(coro, "cr_frame", None)
+    if frame is not None:
+        capture(inspect.currentframe().f_back).install(frame)
+    return asyncio.Task(coro, loop=loop, **kwargs)
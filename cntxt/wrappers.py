@@ -4,25 +4,80 @@ Proxy wrappers for different data types to detect any changes.
 
 import copy
 import inspect
-from functools import partial
-from typing import MutableMapping
-from typing import MutableSequence
-from typing import MutableSet
+import weakref
+from abc import get_cache_token
+from collections.abc import MutableMapping
+from collections.abc import MutableSequence
+from collections.abc import MutableSet
+from enum import Enum
+from numbers import Number
+from typing import NamedTuple
 from typing import TypeVar
 
+from cntxt import proxies
+from cntxt.copying import dereference
 from cntxt.proxies import CallbackWrapper
 
 
 T = TypeVar('T')
 
+# The caller chain of a suspended generator or coroutine can change between resumes, so subjects resolved from their
+# frames are not cached.
+UNCACHEABLE_CODE_FLAGS = (
+    inspect.CO_GENERATOR | inspect.CO_ASYNC_GENERATOR | inspect.CO_COROUTINE | inspect.CO_ITERABLE_COROUTINE
+)
+
+FRAME_GUARD_KEY = "_cntxt_frame_guard"
+
+
+class FrameGuard:
+    """
+    Placed in the locals of a frame, to tell that the frame has ended without keeping a reference to it.
+    """
+
+    __slots__ = "__weakref__",
+
 
 class DynamicObject(CallbackWrapper):
+    """
+    Proxy for the value at `_path`, a tuple of keys and attribute names, within the current value of a dynamic
+    structure.
 
-    def __init__(self, path, manager, osa=object.__setattr__):
-        super().__init__(partial(manager.get_subject, path))
+    The resolved subject is cached together with the manager generation and the calling frame outside of cntxt.
+    Stack values visible from a frame only change when the manager generation changes, so the cached subject is
+    valid as long as both match. The frame is recognized by its id and a weakly referenced FrameGuard in its locals,
+    so that the cache does not keep the frame alive, and a new frame reusing the id does not match.
+    """
+
+    __slots__ = "_manager", "_cached_subject", "__weakref__"
 
+    def __init__(self, path, manager, osa=object.__setattr__):
         osa(self, '_path', path)  # noqa
         osa(self, '_manager', manager)  # noqa
+        osa(self, '_cached_subject', None)  # noqa
+
+    @property
+    def __subject__(self, oga=object.__getattribute__, osa=object.__setattr__):
+        frame = inspect.currentframe().f_back
+        while frame.f_globals is proxy_globals or frame.f_globals is wrapper_globals:
+            frame = frame.f_back
+
+        manager = oga(self, '_manager')
+        generation = manager.generation
+        cached = oga(self, '_cached_subject')
+        if cached and cached[0] == generation and cached[1] == id(frame) and cached[2]() is not None:
+            return cached[3]
+
+        subject = manager.get_subject(oga(self, '_path'), frame)
+        code_flags = frame.f_code.co_flags
+        # Module and class bodies are not cached, as their locals outlive the frame
+        if code_flags & inspect.CO_OPTIMIZED and not code_flags & UNCACHEABLE_CODE_FLAGS:
+            frame_locals = frame.f_locals
+            guard = frame_locals.get(FRAME_GUARD_KEY)
+            if guard is None:
+                guard = frame_locals[FRAME_GUARD_KEY] = FrameGuard()
+            osa(self, '_cached_subject', (generation, id(frame), weakref.ref(guard), subject))
+        return subject
 
     def __repr__(self):
         return self.__subject__.__repr__()
@@ -42,18 +97,24 @@ class DynamicObject(CallbackWrapper):
         self._manager.end_with_block(inspect.currentframe().f_back)
 
     def __getattribute__(self, attr, oga=object.__getattribute__):
+        if attr in ("_path", "_manager", "_cached_subject"):
+            return oga(self, attr)
+        elif not attr.startswith("_") and attr in oga(self, "_mutating_methods"):
+            return oga(self, attr)
         subject = oga(self, "__subject__")
         if attr == "__subject__":
             return subject
-        elif attr in ("_path", "_manager"):
-            return oga(self, attr)
         elif attr.startswith("_"):
             return getattr(subject, attr)
         else:
-            return wrap_target(getattr(subject, attr), self._path + [attr], self._manager)
+            return wrap_target(getattr(subject, attr), oga(self, "_path") + (attr,), oga(self, "_manager"))
+
+    def __getitem__(self, arg, oga=object.__getattribute__):
+        return wrap_target(self.__subject__[arg], oga(self, "_path") + (arg,), oga(self, "_manager"))
 
-    def __getitem__(self, arg):
-        return wrap_target(self.__subject__[arg], self._path + [arg], self._manager)
+
+proxy_globals = vars(proxies)
+wrapper_globals = globals()
 
 
 class DynamicMapping(DynamicObject):
@@ -61,28 +122,135 @@ class DynamicMapping(DynamicObject):
     Wrapper for MutableMappings.
     """
 
+    __slots__ = ()
+
 
 class DynamicSequence(DynamicObject):
     """
     Wrapper for MutableSequences.
     """
 
+    __slots__ = ()
+
 
 class DynamicSet(DynamicObject):
     """
     Wrapper for MutableSets.
     """
 
+    __slots__ = ()
+
 
 class DynamicCustomObject(DynamicObject):
     """ If an object has a __dict__ attribute, we track attribute changes. """
 
+    __slots__ = ()
+
+
+class DynamicTypes(dict):
+    """
+    Wrapper classes by ABC, checked in order. Changing the registrations clears the type classification cache.
+    """
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        type_classifications.clear()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        type_classifications.clear()
+
+    def pop(self, *args):
+        result = super().pop(*args)
+        type_classifications.clear()
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        type_classifications.clear()
+        return result
+
+    def setdefault(self, key, default=None):
+        result = super().setdefault(key, default)
+        type_classifications.clear()
+        return result
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        type_classifications.clear()
+
+    def __ior__(self, other):
+        result = super().__ior__(other)
+        type_classifications.clear()
+        return result
+
+    def clear(self):
+        super().clear()
+        type_classifications.clear()
+
+
+class TypeClassification(NamedTuple):
+    wrapper: type | None  # Registered wrapper class, if any
+    container: type | None  # MutableSequence, MutableMapping, MutableSet or None
+    immutable: bool | None  # None for tuples and frozensets, which are immutable if their items are
+
+
+IMMUTABLE_TYPES = Number, str, bytes, Enum, type(None)
 
-dynamic_types = {
+
+class TypeClassifications(dict):
+    """
+    Cache of TypeClassifications by concrete type.
+
+    ABC registrations change the result of isinstance checks for existing types, so the cache is also cleared when
+    the abc module cache token changes.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.token = get_cache_token()
+
+    def __missing__(self, target_type):
+        wrapper = next((wrapper for abc, wrapper in dynamic_types.items() if issubclass(target_type, abc)), None)
+        container = next(
+            (abc for abc in (MutableSequence, MutableMapping, MutableSet) if issubclass(target_type, abc)), None,
+        )
+        if issubclass(target_type, (tuple, frozenset)):
+            immutable = None
+        else:
+            immutable = issubclass(target_type, IMMUTABLE_TYPES)
+        self[target_type] = classification = TypeClassification(wrapper, container, immutable)
+        return classification
+
+
+type_classifications = TypeClassifications()
+
+dynamic_types = DynamicTypes({
     MutableSequence: DynamicSequence,
     MutableMapping: DynamicMapping,
     MutableSet: DynamicSet,
-}
+})
+
+
+def classify(target_type):
+    """
+    Returns the TypeClassification of a type, computing it only once per type.
+    """
+    if type_classifications.token != get_cache_token():
+        type_classifications.clear()
+        type_classifications.token = get_cache_token()
+    return type_classifications[target_type]
+
+
+def is_immutable(value):
+    """
+    Returns True for numbers, strings, bytes, enum members and None, and for tuples and frozensets of those.
+    """
+    immutable = classify(type(value)).immutable
+    if immutable is None:
+        return all(is_immutable(item) for item in value)
+    return immutable
+
 
 mutating_methods = {
     DynamicObject: [
@@ -100,10 +268,13 @@ mutating_methods = {
     ],
 }
 
-# Add tracking wrappers to all mutating functions.
 
-for dynamic_type in mutating_methods:
-    for func_name in mutating_methods[dynamic_type]:
+def track_mutating_methods(dynamic_type, method_names):
+    """
+    Adds tracking wrappers to the mutating methods of a wrapper class.
+    """
+    dynamic_type._mutating_methods = frozenset(method_names)
+    for func_name in method_names:
         def func(self, *args, tracker_function_name=func_name, **kwargs):
             result = self._manager.mutate(
                 inspect.currentframe().f_back,
@@ -118,11 +289,46 @@ for dynamic_type in mutating_methods:
         getattr(dynamic_type, func_name).__name__ = func_name
 
 
-def wrap_target(target: T, path: list, manager: "Manager") -> T:
-    for abc, wrapper in dynamic_types.items():
-        if isinstance(target, abc):
-            return wrapper(path, manager)
-    return DynamicObject(path, manager)
+for dynamic_type in mutating_methods:
+    track_mutating_methods(dynamic_type, mutating_methods[dynamic_type])
+
+
+def register_dynamic_type(abc, wrapper, methods=()):
+    """
+    Registers a wrapper class for values that are instances of `abc`, typically a DynamicObject subclass.
+
+    Calls to the mutating `methods` of wrapped values are tracked in addition to the ones tracked by the wrapper's
+    base classes. Registrations are checked in order, so register custom types before the more general ones they
+    would also match, or remove the general ones from `dynamic_types` first.
+    """
+    method_names = [*getattr(wrapper, "_mutating_methods", ()), *methods]
+    mutating_methods[wrapper] = method_names
+    track_mutating_methods(wrapper, method_names)
+    dynamic_types[abc] = wrapper
+
+
+def wrap_target(target: T, path: tuple, manager: "Manager") -> T:
+    """
+    Returns a proxy for the target at path, reusing the manager's live proxy for the same path and wrapper class.
+
+    If the manager has `plain_leaves`, immutable values below the root are returned as is. Values marked with ref()
+    are wrapped according to the marked value.
+    """
+    target = dereference(target)
+    classification = classify(type(target))
+    if manager.plain_leaves and path and (
+        classification.immutable or classification.immutable is None and is_immutable(target)
+    ):
+        return target
+    wrapper = classification.wrapper or DynamicObject
+    key = wrapper, path
+    try:
+        return manager.proxies[key]
+    except KeyError:
+        proxy = manager.proxies[key] = wrapper(path, manager)
+        return proxy
+    except TypeError:  # Unhashable path, e.g. with a slice
+        return wrapper(path, manager)
 
 
 def wrap_members(tracked: DynamicObject):
@@ -137,7 +343,7 @@ def wrap_members(tracked: DynamicObject):
 
     for key, value in get_iterable(tracked.__subject__):
         if is_dynamic(value):
-            updated_path = path + [key]
+            updated_path = path + (key,)
             if value._path != updated_path:
                 to_wrap.append((key, value.__subject__))
         elif should_wrap(value):
@@ -147,7 +353,7 @@ def wrap_members(tracked: DynamicObject):
             tracked.__subject__,
             key,
             value,
-            wrap_target(value, path + [key], tracked._manager),
+            wrap_target(value, path + (key,), tracked._manager),
         )
 
 
@@ -157,11 +363,12 @@ def get_iterable(obj):
 
     For class instances, only returns attributes that do not start with '_' (public attributes).
     """
-    if isinstance(obj, MutableSequence):
+    container = classify(type(obj)).container
+    if container is MutableSequence:
         return enumerate(obj)
-    elif isinstance(obj, MutableMapping):
+    elif container is MutableMapping:
         return obj.items()
-    elif isinstance(obj, MutableSet):
+    elif container is MutableSet:
         return ((value, value) for value in obj)
     elif hasattr(obj, '__dict__'):
         return ((key, value) for key, value in obj.__dict__.items() if not key.startswith('_'))
@@ -173,7 +380,7 @@ def should_wrap(contained):
     if isinstance(contained, DynamicObject):
         return False
 
-    if isinstance(contained, tuple(dynamic_types.keys())):
+    if classify(type(contained)).wrapper:
         return True
     if hasattr(contained, "__dict__"):
         return True
@@ -184,9 +391,10 @@ def should_wrap(contained):
 
 
 def set_value(target, key, old_value, new_value):
-    if isinstance(target, (MutableSequence, MutableMapping)):
+    container = classify(type(target)).container
+    if container is MutableSequence or container is MutableMapping:
         target[key] = new_value
-    elif isinstance(target, MutableSet):
+    elif container is MutableSet:
         target.remove(old_value)
         target.add(new_value)
     elif hasattr(target, "__dict__"):
@@ -15,19 +15,25 @@ class Animation(Context):
     end_delay: float = None
 
 
-# Convenience context managers
+# Convenience context managers, prepared once as they are typically used in loops
+
+_duration = Animation.prepare(duration=DEFAULT_DURATION)
+_ease = Animation.prepare(ease=EASE_IN_OUT)
+_start_delay = Animation.prepare(start_delay=0.3)
+_end_delay = Animation.prepare(end_delay=0.3)
+
 
 def duration(duration=DEFAULT_DURATION):
-    return Animation.set(duration=duration)
+    return _duration.set(duration=duration)
 
 
 def ease(ease_func=EASE_IN_OUT):
-    return Animation.set(ease=ease_func)
+    return _ease.set(ease=ease_func)
 
 
 def start_delay(start_delay=0.3):
-    return Animation.set(start_delay=start_delay)
+    return _start_delay.set(start_delay=start_delay)
 
 
 def end_delay(end_delay=0.3):
-    return Animation.set(end_delay=end_delay)
+    return _end_delay.set(end_delay=end_delay)
@@ -1,17 +1,32 @@
 import asyncio
+import contextvars
+import inspect
 import time
 from asyncio import TaskGroup
 from dataclasses import asdict
+from dataclasses import dataclass
+from dataclasses import field
 from dataclasses import is_dataclass
+from functools import wraps
 from threading import Thread
 
 import pytest
 
+from cntxt import DataclassStack
+from cntxt import REMOVED
 from cntxt import Stack
+from cntxt import capture_all
 from cntxt import context
 from cntxt import Context
-from cntxt import dynamic
+from cntxt import ContextVarStorage
 from cntxt import stack
+from cntxt import instrumentation
+from cntxt import locals_key
+from cntxt import restore_all
+from cntxt import update_dict
+from cntxt.manager import dynamic
+from cntxt.storage import FrameStorage
+from cntxt.tasks import task_factory
 
 
 class Ctx(Context):
@@ -28,6 +43,16 @@ class Ctx2(Context):
     d: SubValue = None
 
 
+class VarCtx(Context, storage=ContextVarStorage):
+    a: int = None
+    b: str = None
+
+
+class CachedCtx(Context, merge_cache=2):
+    a: int = None
+    b: list = None
+
+
 variable_with_global_module_scope = 1
 
 def test_scopes():
@@ -56,6 +81,7 @@ def test_scopes():
     main()
 
 
+@pytest.mark.xfail(reason="Placeholder for unfinished dynamic() behavior", strict=True)
 def test_dynamic():
     stack = dynamic(dict())
 
@@ -175,6 +201,23 @@ def test_stack_with_multiple_levels_of_contexts_and_functions():
     assert stack.a == 1
 
 
+def test_stack_compaction():
+    for i in range(100):
+        stack.a = i
+        stack.b = i
+
+    assert stack.a == stack.b == 99
+    assert len(inspect.currentframe().f_locals[locals_key(stack)]) == 1
+
+    with stack.set(a=100):
+        stack.b = 100
+        assert len(inspect.currentframe().f_locals[locals_key(stack)]) == 2
+        assert stack.a == stack.b == 100
+
+    assert stack.a == stack.b == 99
+    assert len(inspect.currentframe().f_locals[locals_key(stack)]) == 1
+
+
 def test_dataclass_stack():
     class Conf:
         hostname: str = "https://host.net"
@@ -196,6 +239,105 @@ def test_dataclass_stack():
         conf.port = 80
 
 
+def test_update_dict__structural_sharing():
+    """
+    Check that only the containers along the updated paths are copied.
+    """
+    dct = {"a": {"b": {"c": 1}, "d": [1, 2]}, "e": {"f": 1}, "g": [1, 2]}
+
+    updated = update_dict(dct, a__b__c=2, g__1=REMOVED)
+
+    assert updated == {"a": {"b": {"c": 2}, "d": [1, 2]}, "e": {"f": 1}, "g": [1]}
+    assert dct == {"a": {"b": {"c": 1}, "d": [1, 2]}, "e": {"f": 1}, "g": [1, 2]}
+
+    assert updated["a"] is not dct["a"]
+    assert updated["a"]["b"] is not dct["a"]["b"]
+    assert updated["a"]["d"] is dct["a"]["d"]
+    assert updated["e"] is dct["e"]
+
+
+def test_nested_dataclass_updates():
+    """
+    Check that nested Context values stay dataclass instances when updated by path.
+    """
+    with Ctx2.set(c=1, d=SubValue(e=1)):
+        parent_d = Ctx2.d
+        with Ctx2.set(d__e=2):
+            assert Ctx2.d == SubValue(e=2)
+            assert Ctx2.c == 1
+        assert Ctx2.d is parent_d
+        assert Ctx2.d == SubValue(e=1)
+
+
+def test_dataclass_stack_subclass():
+    class Conf(DataclassStack):
+        hostname: str = "https://host.net"
+        port: int = 80
+
+    conf = Conf()
+
+    assert conf.hostname == "https://host.net"
+
+    def calling_func():
+        conf.hostname = "https://newhost.net"
+        func()
+
+    def func():
+        assert conf.hostname == "https://newhost.net"
+        assert conf.port == 80
+
+    calling_func()
+    assert conf.hostname == "https://host.net"
+
+    with pytest.raises(AttributeError):
+        conf.not_a_field = 1
+
+
+def test_generated_merge():
+    """
+    Check that dataclass contexts get a generated merge that matches the generic behavior.
+    """
+    @dataclass
+    class Nested:
+        e: int = 0
+
+    class Generated(Context):
+        a: int = 1
+        b: list = field(default_factory=list)
+        c: Nested = field(default_factory=Nested)
+
+    class PostInit(Context):
+        a: int = 1
+
+        def __post_init__(self):
+            self.a = self.a * 2
+
+    assert Generated._merge.__qualname__.endswith("Generated._merge")
+
+    with Generated.set(a=2, b=[1], c__e=1):
+        parent = Generated._current_scope()
+        with Generated.set(c__e=2, a=REMOVED):
+            assert (Generated.a, Generated.b, Generated.c) == (1, [1], Nested(e=2))
+            assert Generated.b is parent.b
+        assert Generated.c == Nested(e=1)
+
+        with pytest.raises(TypeError):
+            with Generated.set(unknown=1):
+                pass
+
+    class CustomInit(Context):
+        a: int = 1
+
+        def __init__(self, a=1):
+            self.a = abs(a)
+
+    with PostInit.set(a=2):
+        assert PostInit.a == 4
+
+    with CustomInit.set(a=-3):
+        assert CustomInit.a == 3
+
+
 def test_dict_based_context():
     """
     Check that dict-based contexts are created, updated and dropped as expected.
@@ -338,6 +480,257 @@ def test_double_wrap():
     some_func(0)
 
 
+def test_double_wrap__fused():
+    """
+    Wraps of the same class enter a single scope, with the inner wrap taking precedence.
+    """
+    scope_counts = []
+
+    def some_func():
+        """Docstring"""
+        scope_counts.append(len(inspect.currentframe().f_back.f_locals[Ctx._class_identifier()]))
+        return Ctx.a, Ctx.b
+
+    wrapped = Ctx.wrap(Ctx.wrap(some_func, a=1), a=2, b="b")
+
+    assert wrapped() == (1, "b")
+    assert scope_counts == [1]
+    assert wrapped.__name__ == "some_func"
+    assert wrapped.__doc__ == "Docstring"
+    assert wrapped.__wrapped__ is some_func
+
+
+def test_double_wrap__decorator_between():
+    """
+    Wraps are not fused through other decorators, which copy the attributes of the inner wrapper.
+    """
+    calls = []
+
+    def logging_decorator(func):
+        @wraps(func)
+        def logged(*args, **kwargs):
+            calls.append(func.__name__)
+            return func(*args, **kwargs)
+        return logged
+
+    def some_func():
+        return Ctx.a, Ctx.b
+
+    wrapped = Ctx.wrap(logging_decorator(Ctx.wrap(some_func, a=1)), b=2)
+
+    assert wrapped() == (1, 2)
+    assert calls == ["some_func"]
+
+
+@pytest.mark.parametrize("context_type", (Ctx, VarCtx))
+def test_wrap__async(context_type):
+    """
+    Wrapped coroutines and async generators see the scope whenever they run, other tasks do not.
+    """
+    @context_type.wrap
+    async def other():
+        await asyncio.sleep(0)
+        return context_type.a
+
+    async def coroutine(x):
+        await asyncio.sleep(0.01)
+        return context_type.a, context_type.b, x
+
+    async def generator():
+        try:
+            value = yield context_type.a
+            await asyncio.sleep(0)
+            yield context_type.a, value
+        except ValueError:
+            yield context_type.a, "error"
+        finally:
+            closed.append(context_type.a)
+
+    closed = []
+    coroutine = context_type.wrap(context_type.wrap(coroutine, a=1), b="b")
+    generator = context_type.wrap(generator, a=2)
+
+    async def main():
+        assert await asyncio.gather(coroutine(1), other(), coroutine(2)) == [(1, "b", 1), None, (1, "b", 2)]
+        assert context_type.a is None
+
+        iterator = generator()
+        assert await iterator.asend(None) == 2
+        assert context_type.a is None
+        assert await iterator.asend("value") == (2, "value")
+        await iterator.aclose()
+        assert closed == [2]
+
+        iterator = generator()
+        await iterator.asend(None)
+        assert await iterator.athrow(ValueError) == (2, "error")
+        assert [item async for item in generator()] == [2, (2, None)]
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("context_type", (Ctx, VarCtx))
+def test_aset(context_type):
+    async def worker(a):
+        async with context_type.aset(a=a):
+            await asyncio.sleep(0.01)
+            async with context_type.aset(b="b"):
+                assert (context_type.a, context_type.b) == (a, "b")
+            assert (context_type.a, context_type.b) == (a, None)
+        return context_type.a
+
+    async def main():
+        return await asyncio.gather(worker(1), worker(2))
+
+    assert asyncio.run(main()) == [None, None]
+
+
+def test_prepare():
+    """
+    Check that prepared updates behave like set() and can be reused.
+    """
+    plan = Ctx2.prepare(c=0, d__e=None)
+
+    with Ctx2.set(d=SubValue(e=1)):
+        for i in range(3):
+            with plan.set(d__e=i):
+                assert Ctx2.c == 0
+                assert Ctx2.d.e == i
+        assert Ctx2.d.e == 1
+
+        with pytest.raises(TypeError):
+            with plan.set(a=1):
+                pass
+
+
+def test_merge_cache():
+    """
+    Check that repeated identical set() calls reuse the merged scope.
+    """
+    assert Ctx.merge_cache_info() is None
+
+    scopes = set()
+    with CachedCtx.set(a=1):
+        for i in range(5):
+            with CachedCtx.set(b=None):
+                assert CachedCtx.a == 1
+                scopes.add(id(CachedCtx._current_scope()))
+
+    assert len(scopes) == 1
+    info = CachedCtx.merge_cache_info()
+    assert (info.hits, info.misses) == (4, 2)
+
+    with CachedCtx.set(b=[1]):
+        assert CachedCtx.b == [1]
+    assert CachedCtx.merge_cache_info().uncacheable == 1
+
+    for a in range(3):
+        with CachedCtx.set(a=a):
+            assert CachedCtx.a == a
+    assert CachedCtx.merge_cache_info().currsize == 2
+
+
+def test_snapshot():
+    """
+    Check that snapshots hold the effective values and cannot be modified.
+    """
+    assert Ctx.snapshot() == (None, None)
+
+    with Ctx.set(a=1, b="b"):
+        with Ctx.set(a=2):
+            snapshot = Ctx.snapshot()
+
+    assert (snapshot.a, snapshot.b) == (2, "b")
+    assert not hasattr(snapshot, "__dict__")
+    with pytest.raises(AttributeError):
+        snapshot.a = 3
+
+    with context.set(a=1):
+        dict_snapshot = context.snapshot()
+    assert dict_snapshot == {"a": 1}
+    with pytest.raises(TypeError):
+        dict_snapshot["a"] = 2
+
+
+def test_snapshot_private_fields():
+    """
+    Check that snapshots support field names that namedtuple does not accept.
+    """
+    class PrivateCtx(Context):
+        a: int = None
+        _b: int = None
+
+    with PrivateCtx.set(a=1, _b=2):
+        snapshot = PrivateCtx.snapshot()
+
+    assert snapshot == (1, 2)
+    assert (snapshot.a, snapshot._b) == (1, 2)
+    assert not hasattr(snapshot, "__dict__")
+    with pytest.raises(AttributeError):
+        snapshot._b = 3
+
+
+def test_instrumentation():
+    """
+    Check that instrumentation collects per-class statistics and is removed when disabled.
+    """
+    class OtherCtx(Context):
+        __module__ = "other"
+        __qualname__ = "Ctx"
+
+        a: int = None
+
+    ctx_name = f"{Ctx.__module__}.Ctx"
+    ctx2_name = f"{Ctx2.__module__}.Ctx2"
+
+    original_current = FrameStorage.current
+    instrumentation.enable()
+    try:
+        with Ctx.set(a=1, b="b"):
+            with Ctx.set(a=2):
+                assert Ctx.a == 2
+                stats = instrumentation.stats()[ctx_name]
+                assert stats["live_scopes"] == 2
+
+        # Classes with the same name in different modules are kept apart
+        with OtherCtx.set(a=1):
+            assert OtherCtx.a == 1
+
+        with Ctx2.set(d=SubValue(e=1)), Ctx2.set(d__e=2):
+            assert Ctx2.d.e == 2
+
+        dyn = dynamic({"a": [1]}, copy_on_write=True)
+        dyn["a"].append(2)
+
+        stats = instrumentation.stats()
+        assert stats[ctx_name]["live_scopes"] == 0
+        assert stats[ctx_name]["merges"] == 2
+        assert "copies" not in stats[ctx_name]
+        assert stats[ctx2_name]["copies"] == 1
+        assert stats[ctx_name]["lookups"] == sum(stats[ctx_name]["lookup_depth"].values()) >= 1
+        assert stats["other.Ctx"]["merges"] == 1
+        assert stats["dynamic(dict)"]["copies"] == 1
+
+        instrumentation.reset()
+        assert instrumentation.stats() == {}
+    finally:
+        instrumentation.disable()
+
+    assert FrameStorage.current is original_current
+    assert not instrumentation.is_enabled()
+
+
+def test_instrumentation_histogram_buckets():
+    """
+    Histogram buckets are the power-of-two upper bounds of the observed values.
+    """
+    stats = instrumentation.Stats()
+    for value in (0, 0.2, 0.6, 1, 1.5, 2, 3, 4, 4.1):
+        stats.observe("count", "histogram", value)
+
+    assert stats.as_dict() == {"count": 9, "histogram": {0: 1, 1: 3, 2: 2, 4: 2, 8: 1}}
+
+
 def test_thread_safety__calling_thread():
     """
     Confirm that thread stacks are separate.
@@ -395,6 +788,31 @@ def test_asyncio():
         asyncio.run(main())
 
 
+def test_asyncio__task_factory():
+    """
+    With the cntxt task factory, tasks see the scopes where they were created, and do not see each other's scopes.
+    """
+    async def worker(b_should_be: str):
+        assert Ctx.a == 1
+        assert Ctx.b == b_should_be
+        with Ctx.set(b=f"{b_should_be} in task"):
+            await asyncio.sleep(0.01)
+            assert Ctx.b == f"{b_should_be} in task"
+        assert Ctx.b == b_should_be
+
+    async def main():
+        asyncio.get_running_loop().set_task_factory(task_factory)
+        with Ctx.set(b="b"):
+            async with TaskGroup() as group:
+                group.create_task(worker(b_should_be="b"))
+                with Ctx.set(b="c"):
+                    group.create_task(worker(b_should_be="c"))
+                assert Ctx.b == "b"
+
+    with Ctx.set(a=1):
+        asyncio.run(main())
+
+
 def test_recursion():
     """
     Check that nothing surprising happens with recursion.
@@ -415,3 +833,210 @@ def test_recursion():
 
     assert counter == 10
     assert Ctx.a is None
+
+
+def test_context_var_storage():
+    """
+    Check that a ContextVar-backed context behaves like the frame-based one, also through recursion.
+    """
+    assert isinstance(VarCtx._scope_storage, ContextVarStorage)
+    assert VarCtx._current_scope() is None
+
+    def recursive(counter=0):
+        counter += 1
+        with VarCtx.set(a=VarCtx.a + 1 if VarCtx.a else 1, b="b"):
+            assert VarCtx.a == counter
+            assert VarCtx.b == "b"
+            if VarCtx.a < 10:
+                return recursive(counter)
+            return counter
+
+    with VarCtx.set(b="a"):
+        assert recursive() == 10
+        assert VarCtx.a is None
+        assert VarCtx.b == "a"
+
+    assert VarCtx._current_scope() is None
+
+
+def test_context_var_storage__threads():
+    """
+    Threads do not see the scopes of the calling thread, and keep their own stacks.
+    """
+    errors = []
+
+    def thread(delay):
+        try:
+            assert VarCtx.a is None
+            with VarCtx.set(a=delay):
+                time.sleep(delay)
+                assert VarCtx.a == delay
+        except AssertionError as error:
+            errors.append(error)
+
+    with VarCtx.set(a=1):
+        threads = [Thread(target=thread, args=(delay,)) for delay in (0.1, 0.05)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert VarCtx.a == 1
+
+    assert not errors
+
+
+def test_context_var_storage__asyncio():
+    """
+    With ContextVar storage, tasks see the scope where they were created, unlike with frame storage in
+    test_asyncio, where tasks see the scope of the TaskGroup.
+    """
+    async def worker(b_should_be: str):
+        assert VarCtx.a == 1
+        assert VarCtx.b == b_should_be
+        with VarCtx.set(b="d"):
+            assert VarCtx.b == "d"
+
+    async def main():
+        with VarCtx.set(b="b"):
+            async with TaskGroup() as group:
+                group.create_task(worker(b_should_be="b"))
+                with VarCtx.set(b="c"):
+                    group.create_task(worker(b_should_be="c"))
+
+    with VarCtx.set(a=1):
+        asyncio.run(main())
+
+
+@pytest.mark.parametrize("context_type", (Ctx, VarCtx))
+def test_context_var_storage__generator(context_type):
+    """
+    Sync generators have no contextvars of their own, so with ContextVar storage, a scope entered in a generator is
+    seen by the consumer between the steps, and the generator cannot be closed from another contextvars context
+    while the scope is active.
+    """
+    def generator():
+        with context_type.set(a=1):
+            yield context_type.a
+            yield context_type.a
+
+    values = generator()
+    assert next(values) == 1
+    assert context_type.a == (1 if context_type is VarCtx else None)
+    assert next(values) == 1
+    with pytest.raises(StopIteration):
+        next(values)
+    assert context_type.a is None
+
+    values = generator()
+    consumer = contextvars.copy_context()
+    consumer.run(next, values)
+    if context_type is VarCtx:
+        with pytest.raises(ValueError):
+            values.close()
+        # The scope is left in the context of the consumer
+        assert consumer.run(lambda: VarCtx.a) == 1
+    else:
+        values.close()
+        assert consumer.run(lambda: Ctx.a) is None
+    assert context_type.a is None
+
+
+class FrozenCtx(Context, frozen=True, slots=True):
+    a: int = 1
+    b: dict = None
+
+
+def test_frozen_slotted_context():
+    from dataclasses import FrozenInstanceError
+
+    assert FrozenCtx.a == 1
+
+    with FrozenCtx.set(b={"c": 1}):
+        scope = FrozenCtx._current_scope()
+        assert not hasattr(scope, "__dict__")
+        with pytest.raises(FrozenInstanceError):
+            scope.a = 2
+
+        with FrozenCtx.set(a=2, b__c=3):
+            assert FrozenCtx.a == 2
+            assert FrozenCtx.b == {"c": 3}
+        assert FrozenCtx.b == {"c": 1}
+
+
+def test_frozen_slotted_context__inheritance():
+    class Child(FrozenCtx, storage=ContextVarStorage):
+        c: str = "c"
+
+    assert Child.__dataclass_params__.frozen
+    assert isinstance(Child._scope_storage, ContextVarStorage)
+
+    with Child.set(c="d"):
+        assert Child.c == "d"
+        assert Child.a == 1
+
+
+def test_context_without_fields():
+    """
+    Subclasses without fields are dataclasses too, only the library root classes stay plain classes.
+    """
+    class Empty(Context):
+        pass
+
+    assert is_dataclass(Empty)
+    with Empty.set():
+        assert isinstance(Empty._current_scope(), Empty)
+
+
+def test_capture_restore():
+    with Ctx.set(a=1, b="b"):
+        token = Ctx.capture()
+        scope = Ctx._current_scope()
+
+    assert Ctx.a is None
+
+    with Ctx.set(a=2):
+        with Ctx.restore(token):
+            assert Ctx._current_scope() is scope
+            assert (Ctx.a, Ctx.b) == (1, "b")
+            with Ctx.set(b="c"):
+                assert (Ctx.a, Ctx.b) == (1, "c")
+        assert (Ctx.a, Ctx.b) == (2, None)
+
+    empty_token = Ctx.capture()
+    with Ctx.set(a=3), Ctx.restore(empty_token):
+        assert Ctx.a is None
+
+    with pytest.raises(TypeError):
+        with VarCtx.restore(token):
+            pass
+
+
+def test_capture_restore__all():
+    class Namespace:
+        c: int = 0
+
+    dyn = dynamic(Namespace, plain_leaves=True)
+    stack_ = Stack()
+
+    def capture_in_scopes():
+        dyn.c = 1
+        stack_.d = 2
+        with Ctx.set(a=1), VarCtx.set(a=2), context.set(e=3):
+            return capture_all()
+
+    def read():
+        try:
+            e = context["e"]
+        except KeyError:
+            e = None
+        return Ctx.a, VarCtx.a, e, dyn.c, getattr(stack_, "d", None)
+
+    scopes = capture_in_scopes()
+    assert read() == (None, None, None, 0, None)
+
+    with restore_all(scopes):
+        assert read() == (1, 2, 3, 1, 2)
+        dyn.c = 4
+        assert read() == (1, 2, 3, 4, 2)
+
+    assert read() == (None, None, None, 0, None)
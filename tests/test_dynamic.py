@@ -1,3 +1,5 @@
+import inspect
+import weakref
 from dataclasses import asdict
 from dataclasses import dataclass
 from dataclasses import field
@@ -5,9 +7,21 @@ from dataclasses import field
 from pydantic.dataclasses import dataclass as pydantic_dataclass
 import pytest
 
+from cntxt import ref
+from cntxt.copying import DEEP_COPY
+from cntxt.copying import SHARE
+from cntxt.copying import copy_policy
+from cntxt.copying import register_copy_policy
+from cntxt.copying import registered_policies
+from cntxt.copying import resolved_policies
+from cntxt.manager import batch
 from cntxt.manager import dynamic
 from cntxt.manager import fix
 from cntxt.manager import stack
+from cntxt.wrappers import DynamicObject
+from cntxt.wrappers import classify
+from cntxt.wrappers import dynamic_types
+from cntxt.wrappers import register_dynamic_type
 
 
 def test_vanilla_scopes():
@@ -105,6 +119,275 @@ def test_dynamic_dict():
     assert d == 2
 
 
+def test_copy_on_write():
+    big = list(range(1000))
+    dynamic_dict = dynamic({"a": {"b": 0, "c": {"d": 0}}, "big": big}, copy_on_write=True)
+
+    def child():
+        dynamic_dict["a"]["b"] = 1
+        dynamic_dict["big"].append(1000)
+
+        assert dynamic_dict["a"] == {"b": 1, "c": {"d": 0}}
+        assert len(dynamic_dict["big"]) == 1001
+
+        return dynamic_dict["a"]["c"].__subject__
+
+    def grandchild_of_root():
+        dynamic_dict["a"]["b"] = 2
+        assert dynamic_dict["big"].__subject__ is big
+
+    shared_c = child()
+
+    assert dynamic_dict["a"] == {"b": 0, "c": {"d": 0}}
+    assert dynamic_dict["a"]["c"].__subject__ is shared_c
+    assert dynamic_dict["big"].__subject__ is big
+    assert len(big) == 1000
+
+    grandchild_of_root()
+
+
+def test_register_dynamic_type():
+    class Tally:
+        def __init__(self):
+            self.count = 0
+
+        def increment(self):
+            self.count += 1
+
+    class DynamicTally(DynamicObject):
+        pass
+
+    register_dynamic_type(Tally, DynamicTally, methods=["increment"])
+    try:
+        tally = dynamic(Tally())
+        assert type(tally) is DynamicTally
+
+        def child():
+            tally.increment()
+            assert tally.count == 1
+
+        child()
+        assert tally.count == 0
+    finally:
+        del dynamic_types[Tally]
+
+    assert classify(Tally).wrapper is None
+
+    registry = dynamic_types
+    registry |= {Tally: DynamicTally}
+    try:
+        assert classify(Tally).wrapper is DynamicTally
+    finally:
+        del dynamic_types[Tally]
+
+
+def test_proxy_interning():
+    dynamic_dict = dynamic({"a": {"b": [1]}})
+
+    proxy = dynamic_dict["a"]["b"]
+    same_proxy = dynamic_dict["a"]["b"] is proxy
+    assert same_proxy
+    assert proxy._path == ("a", "b")
+    assert type(proxy).__dictoffset__ == 0
+
+    proxy_ref = weakref.ref(proxy)
+    del proxy
+    assert dynamic_dict["a"]["b"] == [1]  # Also refreshes the f_locals snapshot that still refers to the proxy
+    assert proxy_ref() is None
+
+
+def test_subject_cache():
+    dynamic_dict = dynamic({"a": [0]})
+    held = dynamic_dict["a"]
+
+    def child():
+        assert held == [0]
+        dynamic_dict["a"].append(1)
+        assert held == [0, 1]
+        return held.__subject__
+
+    def generator():
+        while True:
+            yield held.__subject__
+
+    assert held == [0]
+    assert child() == [0, 1]
+    assert held == [0]
+
+    values = generator()
+    assert next(values) == [0]
+
+    def resume_in_child():
+        dynamic_dict["a"].append(2)
+        return next(values)
+
+    assert resume_in_child() == [0, 2]
+    assert next(values) == [0]
+
+
+def test_subject_cache_in_coroutine():
+    dynamic_dict = dynamic({"a": [0]})
+    held = dynamic_dict["a"]
+
+    class Suspend:
+        def __await__(self):
+            yield
+
+    async def read_on_resume(values):
+        while True:
+            values.append(held.__subject__)
+            await Suspend()
+
+    values = []
+    coroutine = read_on_resume(values)
+    coroutine.send(None)
+
+    def resume_in_child():
+        dynamic_dict["a"].append(2)
+        coroutine.send(None)
+
+    resume_in_child()
+    coroutine.send(None)
+    coroutine.close()
+    assert values == [[0], [0, 2], [0]]
+
+
+def test_subject_cache_does_not_keep_frame_alive():
+    dynamic_dict = dynamic({"a": [0]})
+    held = dynamic_dict["a"]
+
+    class Local:
+        pass
+
+    def child():
+        local = Local()
+        assert held == [0]
+        return weakref.ref(local)
+
+    assert child()() is None
+
+    def read():
+        return held.__subject__
+
+    def outer():
+        dynamic_dict["a"].append(1)
+        return read()
+
+    # The scope set in outer() ends with the frame, and a new frame reusing the id of the cached one does not match
+    assert outer() == [0, 1]
+    assert read() == [0]
+
+
+def test_plain_leaves():
+    dynamic_dict = dynamic({"a": 1, "b": "b", "c": (1, "c"), "d": (1, []), "e": [1]}, plain_leaves=True)
+
+    assert type(dynamic_dict["a"]) is int
+    assert type(dynamic_dict["b"]) is str
+    assert type(dynamic_dict["c"]) is tuple
+    assert isinstance(dynamic_dict["d"], DynamicObject)
+    assert isinstance(dynamic_dict["e"], DynamicObject)
+    assert type(dynamic_dict["e"][0]) is int
+
+    def child():
+        dynamic_dict["a"] = 2
+        assert dynamic_dict["a"] == 2
+
+    child()
+    assert dynamic_dict["a"] == 1
+
+
+@pytest.mark.parametrize("copy_on_write", [False, True])
+def test_batch(copy_on_write):
+    dynamic_dict = dynamic({"items": [], "other": {"a": 0}}, copy_on_write=copy_on_write)
+    other = dynamic_dict["other"].__subject__
+
+    def fill():
+        with batch(dynamic_dict):
+            for i in range(100):
+                dynamic_dict["items"].append(i)
+            dynamic_dict["other"]["a"] = 1
+            dynamic_dict["other"]["a"] = 2
+            assert len(dynamic_dict["items"]) == 100
+
+        scopes = inspect.currentframe().f_locals[dynamic_dict._manager.locals_key]
+        assert len(scopes) == 1
+        assert dynamic_dict["other"] == {"a": 2}
+
+        dynamic_dict["items"].append(100)
+        assert len(dynamic_dict["items"]) == 101
+
+    def fail():
+        with pytest.raises(ValueError):
+            with batch(dynamic_dict):
+                dynamic_dict["items"].append(1)
+                raise ValueError()
+        assert dynamic_dict["items"] == []
+
+    fill()
+    fail()
+    assert dynamic_dict["items"] == []
+    assert dynamic_dict["other"].__subject__ is other
+    assert other == {"a": 0}
+
+
+@pytest.mark.parametrize("copy_on_write", [False, True])
+def test_copy_policies(copy_on_write):
+    buffer = bytearray(10)
+    blob = bytes(10)
+    shared = [1]
+    view = memoryview(bytearray(10))
+    dynamic_dict = dynamic(
+        {"buffer": buffer, "blob": blob, "shared": ref(shared), "view": view, "items": []},
+        copy_on_write=copy_on_write,
+    )
+
+    def child():
+        dynamic_dict["items"].append(1)
+        assert dynamic_dict["buffer"].__subject__ is buffer
+        assert dynamic_dict["blob"].__subject__ is blob
+        assert dynamic_dict["shared"].__subject__ is shared
+        assert dynamic_dict["shared"][0] == 1
+        dynamic_dict["shared"].append(2)
+        dynamic_dict["shared"][0] = 3
+        assert dynamic_dict["shared"] == [3, 2]
+        assert dynamic_dict["view"].__subject__.readonly
+        with pytest.raises(TypeError):
+            dynamic_dict["view"][0] = 7
+        with batch(dynamic_dict), pytest.raises(TypeError):
+            dynamic_dict["view"][0] = 7
+
+        dynamic_dict["buffer"][0] = 1
+        assert dynamic_dict["buffer"][0] == 1
+
+    child()
+    assert buffer[0] == 0
+    assert view[0] == 0
+    # Shared values are mutated in place
+    assert shared == [3, 2]
+    fixed = fix(dynamic_dict)
+    assert fixed["buffer"] == buffer and fixed["buffer"] is not buffer
+    fixed["buffer"][0] = 9
+    assert buffer[0] == 0
+
+
+def test_register_copy_policy():
+    class Table:
+        def __init__(self):
+            self.rows = [1, 2, 3]
+
+    table = Table()
+    register_copy_policy(Table, SHARE)
+    try:
+        assert copy_policy(table) is SHARE
+        assert fix({"table": table})["table"] is table
+    finally:
+        del registered_policies[Table]
+        resolved_policies.clear()
+
+    assert copy_policy(table) is DEEP_COPY
+    assert fix({"table": table})["table"] is not table
+
+
 def test_dynamic_dataclass():
     @dataclass
     class ServerSettings:
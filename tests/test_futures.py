@@ -0,0 +1,120 @@
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+
+from cntxt import Context
+from cntxt import ContextVarStorage
+from cntxt import Stack
+from cntxt import context
+import cntxt.futures
+from cntxt.futures import ProcessPoolExecutor
+from cntxt.futures import ThreadPoolExecutor
+from cntxt.manager import dynamic
+from cntxt.scopes import capture
+
+
+class Ctx(Context):
+    a: int = None
+
+
+class VarCtx(Context, storage=ContextVarStorage):
+    a: int = None
+
+
+class SlotCtx(Context, slots=True):
+    a: int = None
+
+
+class Namespace:
+    a: int = None
+
+
+def read_in_process(i):
+    return Ctx.a, VarCtx.a, len(context["blob"]), i
+
+
+def read_slotted_in_process():
+    return SlotCtx.a
+
+
+def cached_in_worker():
+    return Ctx.a, len(cntxt.futures.worker_scopes)
+
+
+def test_capture():
+    stack = Stack()
+    dyn = dynamic(Namespace, plain_leaves=True)
+
+    def read():
+        return Ctx.a, VarCtx.a, context["b"], stack.c, dyn.a
+
+    def inner():
+        stack.c = 3
+        dyn.a = 4
+        with Ctx.set(a=1), VarCtx.set(a=2), context.set(b="b"):
+            return capture()
+
+    scopes = inner()
+
+    assert scopes.run(read) == (1, 2, "b", 3, 4)
+    assert Ctx.a is None
+
+
+def test_thread_pool_executor():
+    def work(i):
+        assert Ctx.a == 1
+        with Ctx.set(a=i):
+            assert Ctx.a == i
+        return Ctx.a, VarCtx.a
+
+    with Ctx.set(a=1), VarCtx.set(a=2), ThreadPoolExecutor(4) as executor:
+        assert executor.submit(work, 5).result() == (1, 2)
+        assert list(executor.map(work, range(20))) == [(1, 2)] * 20
+
+        with Ctx.set(a=3):
+            # Scopes are captured at submit time
+            future = executor.submit(lambda: Ctx.a)
+        assert future.result() == 3
+
+
+def test_process_pool_executor():
+    blob = bytearray(1_000_000)
+
+    with Ctx.set(a=1), VarCtx.set(a=2), context.set(blob=blob), ProcessPoolExecutor(2) as executor:
+        assert executor.submit(read_in_process, 0).result() == (1, 2, len(blob), 0)
+        assert list(executor.map(read_in_process, range(3))) == [(1, 2, len(blob), i) for i in range(3)]
+
+        with Ctx.set(a=3):
+            assert executor.submit(read_in_process, 0).result() == (3, 2, len(blob), 0)
+
+        # One shared snapshot per distinct content
+        assert len(executor._segments) == 2
+        segments = list(executor._segments.values())
+
+    assert not executor._segments
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(segments[0].name)
+
+
+def test_process_pool_executor__slotted_context():
+    with SlotCtx.set(a=1), ProcessPoolExecutor(1) as executor:
+        assert executor.submit(read_slotted_in_process).result() == 1
+
+
+def test_process_pool_executor_releases_evicted_snapshots(monkeypatch):
+    monkeypatch.setattr(cntxt.futures, "SNAPSHOT_CACHE_SIZE", 4)
+    monkeypatch.setattr(cntxt.futures, "WORKER_CACHE_SIZE", 4)
+
+    with ProcessPoolExecutor(1) as executor:
+        for i in range(20):
+            with Ctx.set(a=i):
+                value, cached = executor.submit(cached_in_worker).result()
+            assert value == i
+            assert cached <= 4
+            assert len(executor._segments) <= 4
+        segments = list(executor._segments.values())
+
+    assert not executor._segments
+    for segment in segments:
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(segment.name)
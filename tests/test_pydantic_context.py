@@ -1,6 +1,8 @@
 from dataclasses import asdict
 
 import pytest
+from pydantic import ValidationError
+from pydantic import field_validator
 
 from cntxt.pydantic import Context
 from cntxt.pydantic import PydanticStack as Stack
@@ -64,3 +66,78 @@ def test_nested_context_updates():
                 assert Ctx2.d.e == 2
                 assert asdict(Ctx2._current_scope()) == {"c": 1, "d": {"e": 2}}
             assert Ctx2.d.e == 1
+
+
+validated_values = []
+
+
+class DeltaCtx(Context, delta_validation=True):
+    a: int = None
+    b: list[int] = None
+    d: SubValue | None = None
+
+    @field_validator("b")
+    @classmethod
+    def count_validations(cls, value):
+        validated_values.append(value)
+        return value
+
+
+def test_delta_validation():
+    with DeltaCtx.set(a="1", b=["2"], d=SubValue(e=3)):
+        assert DeltaCtx.a == 1
+        assert DeltaCtx.b == [2]
+        assert validated_values == [[2]]
+        b = DeltaCtx.b
+
+        with DeltaCtx.set(a="4", d__e="5"):
+            assert DeltaCtx.a == 4
+            assert DeltaCtx.d.e == 5
+            assert DeltaCtx.b is b
+            assert validated_values == [[2]]
+
+        with DeltaCtx.set(b__0="6"):
+            assert DeltaCtx.b == [6]
+            assert validated_values == [[2], [6]]
+
+        with pytest.raises(ValidationError):
+            with DeltaCtx.set(a="not a number"):
+                pass
+
+        with pytest.raises(ValidationError):
+            with DeltaCtx.set(d__e="not a number"):
+                pass
+
+        assert DeltaCtx.a == 1
+        assert DeltaCtx.d.e == 3
+
+
+def test_stack_delta_validation():
+    class Conf:
+        port: int = 80
+
+    stack = Stack(Conf, delta_validation=True)
+    stack.port = "81"
+    stack.port = "82"
+    assert stack.port == 82
+
+    with pytest.raises(ValidationError):
+        stack.port = "not a number"
+
+
+class SlottedDeltaCtx(Context, frozen=True, slots=True, delta_validation=True):
+    a: int = None
+    b: str = None
+
+
+def test_frozen_slotted_delta_validation():
+    with SlottedDeltaCtx.set(a="1", b="b"):
+        with SlottedDeltaCtx.set(a="2"):
+            scope = SlottedDeltaCtx._current_scope()
+            assert not hasattr(scope, "__dict__")
+            assert SlottedDeltaCtx.a == 2
+            assert SlottedDeltaCtx.b == "b"
+
+        with pytest.raises(ValidationError):
+            with SlottedDeltaCtx.set(a="not a number"):
+                pass
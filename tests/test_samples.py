@@ -3,6 +3,9 @@ from samples.animation_parameters import EASE_OUT_IN
 from samples.animation_parameters import duration
 from samples.animation_parameters import ease
 from samples.animation_parameters import start_delay
+from samples.dyna_logging import LogLevel
+from samples.dyna_logging import log
+from samples.dyna_logging import stack
 from samples.plugins.configured import core_function
 
 
@@ -23,3 +26,15 @@ def test_animation():
             assert Animation.ease == EASE_OUT_IN
 
             # Introduce other elements here, with some parameters changed but consistent ease function
+
+
+def test_logging(capsys):
+    def noisy_part():
+        stack.log_level = LogLevel.ERROR
+        log(LogLevel.INFO, "hidden")
+        log(LogLevel.ERROR, "error")
+
+    noisy_part()
+    log(LogLevel.INFO, "info")
+
+    assert capsys.readouterr().out == "error\ninfo\n"